@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""
+Benchmark the engine hot paths offline, and report the results as JSON.
+
+Ingestion and DotRoach iterations run against stand-ins (synthetic files, in-memory registry), they only need
+numpy, pandas, astropy and the ics_utils, pfs_utils and pfs_datamodel packages, not the LSST stack nor a
+repository. Quantum graph generation and flux extraction need the full stack and a real repository, and are only
+run when --repo is given.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import socket
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from standIns import StandInEngine, makeSyntheticVisit
+
+
+def summarize(durations, **extra):
+    """Summary statistics of a list of durations, in seconds."""
+    durations = np.array(durations)
+    summary = dict(n=len(durations), min=durations.min(), median=np.median(durations), max=durations.max())
+    summary.update(extra)
+    return dict([(key, float(value) if isinstance(value, (float, np.floating)) else value)
+                 for key, value in summary.items()])
+
+
+def benchIngest(workDir, nVisits, cams, ingestMode):
+    """IngestHandler.doIngest wall time and throughput, per visit."""
+    engine = StandInEngine(workDir, ingestMode=ingestMode)
+    durations, speeds = [], []
+
+    for iVisit in range(nVisits):
+        pfsVisit = makeSyntheticVisit(os.path.join(workDir, 'raw'), '2025-01-01', 100000 + iVisit, cams)
+        engine.ingestIndex.refresh([pfsVisit.visit])
+
+        for file in pfsVisit.allFiles:
+            file.initialize(engine.ingestIndex)
+
+        totalMB = sum([os.path.getsize(file.filepath) for file in pfsVisit.exposureFiles]) / 2 ** 20
+
+        start = time.perf_counter()
+        engine.ingestHandler.doIngest(pfsVisit)
+        duration = time.perf_counter() - start
+
+        if not pfsVisit.isIngested:
+            raise RuntimeError(f'visit {pfsVisit.visit} was not ingested')
+
+        durations.append(duration)
+        speeds.append(totalMB / duration)
+
+    return summarize(durations, nCams=len(cams), ingestMode=ingestMode, medianMBps=float(np.median(speeds)))
+
+
+def benchIngestBatch(workDir, nVisits, cams, ingestMode, chunkSize):
+    """IngestHandler.doIngestBatch wall time and throughput, for the whole range of visits."""
+    engine = StandInEngine(workDir, ingestMode=ingestMode, ingestChunkSize=chunkSize)
+    pfsVisits = []
+
+    for iVisit in range(nVisits):
+        pfsVisits.append(makeSyntheticVisit(os.path.join(workDir, 'raw'), '2025-01-02', 200000 + iVisit, cams))
+
+    engine.ingestIndex.refresh([pfsVisit.visit for pfsVisit in pfsVisits])
+
+    for pfsVisit in pfsVisits:
+        for file in pfsVisit.allFiles:
+            file.initialize(engine.ingestIndex)
+
+    totalMB = sum([os.path.getsize(file.filepath) for pfsVisit in pfsVisits for file in pfsVisit.exposureFiles])
+    totalMB /= 2 ** 20
+
+    start = time.perf_counter()
+    engine.ingestHandler.doIngestBatch(pfsVisits)
+    duration = time.perf_counter() - start
+
+    notIngested = [pfsVisit.visit for pfsVisit in pfsVisits if not pfsVisit.isIngested]
+    if notIngested:
+        raise RuntimeError(f'visits {notIngested} were not ingested')
+
+    return summarize([duration], nVisits=nVisits, nCams=len(cams), ingestMode=ingestMode, chunkSize=chunkSize,
+                     MBps=totalMB / duration)
+
+
+def benchDotRoach(workDir, nIterations):
+    """DotRoach.runAway latency per iteration, fluxes being synthetic instead of extracted."""
+    from drpActor.utils.dotRoach import DotRoach
+    from pfs.datamodel.pfsConfig import FiberStatus
+
+    # same columns as the fps maskFiles, fiberId being needed to normalize with the monitoring fibers.
+    cobras = DotRoach.sgfm.sort_values('cobraId')
+    maskFile = os.path.join(workDir, 'maskFile.csv')
+    pd.DataFrame(dict(cobraId=cobras.cobraId.to_numpy(), fiberId=cobras.fiberId.to_numpy(), bitMask=1)).to_csv(maskFile)
+
+    rng = np.random.default_rng(0)
+    fiberId = DotRoach.gfm.fiberId.to_numpy()
+    flux0 = rng.uniform(1000, 2000, size=len(fiberId))
+
+    class SyntheticDotRoach(DotRoach):
+        iteration = 0
+
+        def collectFiberData(self, files):
+            # flux decreasing as the cobras move away, then increasing again for some of them.
+            decay = np.abs(1 - 0.1 * self.iteration + rng.normal(0, 0.02, size=len(fiberId)))
+            self.iteration += 1
+            return pd.DataFrame(dict(fiberId=fiberId, flux=flux0 * decay))
+
+    os.makedirs(os.path.join(workDir, 'dotRoach'), exist_ok=True)
+    roach = SyntheticDotRoach(StandInEngine(workDir), os.path.join(workDir, 'dotRoach', 'current'), maskFile,
+                              cams=['b1'])
+    # a few fibers at home, used to normalize the lamp response.
+    fiberStatus = np.where(np.arange(len(fiberId)) < 20, FiberStatus.BROKENCOBRA, FiberStatus.GOOD)
+    roach.pfsConfig = pd.DataFrame(dict(fiberId=fiberId, fiberStatus=fiberStatus))
+    files = [SimpleNamespace(visit=visit) for visit in range(200000, 200000 + nIterations)]
+
+    durations = []
+    for iIter, file in enumerate(files):
+        if iIter == nIterations // 2:
+            roach.phase2()
+
+        start = time.perf_counter()
+        roach.runAway([file])
+        durations.append(time.perf_counter() - start)
+
+    roach.finish()
+    return summarize(durations, nCobras=len(cobras), nIterations=nIterations)
+
+
+def benchQuantumGraph(repo, pipelineYaml, inputCollection, where, nRepeat):
+    """ReductionRun.makeQuantumGraph latency, the first build including the pipeline graph resolution."""
+    from drpActor.utils.reduction import ReductionRun
+    from lsst.daf.butler import Butler
+    from lsst.pipe.base import Pipeline
+
+    run = f'benchmarks/{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}'
+    butler = Butler(repo, run=run, collections=[inputCollection], writeable=False)
+    reduction = ReductionRun(Pipeline.fromFile(pipelineYaml), butler, executor=None, timestamp=None)
+
+    durations, nQuanta = [], 0
+    for i in range(nRepeat):
+        start = time.perf_counter()
+        quantumGraph = reduction.makeQuantumGraph(where)
+        durations.append(time.perf_counter() - start)
+        nQuanta = len(quantumGraph)
+
+    return dict(first=durations[0], warm=summarize(durations[1:]) if nRepeat > 1 else None, nQuanta=nQuanta)
+
+
+def benchWindowedFluxes(repo, inputCollection, visit, nRepeat):
+    """extractFlux.getWindowedFluxes time per camera, on the windowed raws of a real visit."""
+    import drpActor.utils.extractFlux as extractFlux
+    from lsst.daf.butler import Butler
+
+    butler = Butler(repo, collections=[inputCollection])
+    refs = butler.registry.queryDatasets('raw', where='visit = v', bind=dict(v=visit))
+    results = dict()
+
+    for ref in refs:
+        dataId = dict(visit=visit, arm=ref.dataId['arm'], spectrograph=ref.dataId['spectrograph'])
+        raw = butler.get('raw.exposure', dataId).convertF()
+        fiberProfiles = butler.get('fiberProfiles', dataId)
+        detectorMap = butler.get('detectorMap_calib', dataId)
+        fiberTrace = fiberProfiles.makeFiberTracesFromDetectorMap(detectorMap)
+
+        durations = []
+        for i in range(nRepeat):
+            exp = raw.clone()
+            start = time.perf_counter()
+            extractFlux.getWindowedFluxes(exp, dataId, fiberTrace=fiberTrace, detectorMap=detectorMap)
+            durations.append(time.perf_counter() - start)
+
+        results[f"{dataId['arm']}{dataId['spectrograph']}"] = summarize(durations)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', type=str, default=None, help='JSON output file, default to stdout')
+    parser.add_argument('--workDir', type=str, default=None, help='scratch directory, default to a temporary one')
+    parser.add_argument('--nVisits', type=int, default=5, help='number of visits to ingest')
+    parser.add_argument('--cams', type=str, default='b1,r1,b2,r2', help='cameras per visit')
+    parser.add_argument('--ingestMode', type=str, default='copy', choices=['copy', 'link'], help='transfer mode')
+    parser.add_argument('--chunkSize', type=int, default=200, help='files per ingest call, for batched ingest')
+    parser.add_argument('--nIterations', type=int, default=20, help='number of DotRoach iterations')
+    parser.add_argument('--repo', type=str, default=None, help='butler repository, for QG and flux benchmarks')
+    parser.add_argument('--collection', type=str, default=None, help='input collection in --repo')
+    parser.add_argument('--pipeline', type=str, default=None, help='pipeline yaml, for QG benchmark')
+    parser.add_argument('--where', type=str, default=None, help='data query, for QG benchmark')
+    parser.add_argument('--visit', type=int, default=None, help='windowed visit, for flux benchmark')
+    parser.add_argument('--nRepeat', type=int, default=3, help='repeats for the repository benchmarks')
+    args = parser.parse_args()
+
+    report = dict(time=datetime.datetime.now(datetime.timezone.utc).isoformat(), host=socket.gethostname(),
+                  python=platform.python_version(), conda=os.environ.get('CONDA_DEFAULT_ENV'), results=dict())
+    results = report['results']
+
+    with tempfile.TemporaryDirectory(dir=args.workDir) as workDir:
+        results['ingest'] = benchIngest(workDir, args.nVisits, args.cams.split(','), args.ingestMode)
+        results['ingestBatch'] = benchIngestBatch(workDir, args.nVisits, args.cams.split(','), args.ingestMode,
+                                                  args.chunkSize)
+        results['dotRoach.runAway'] = benchDotRoach(workDir, args.nIterations)
+
+    if args.repo and args.pipeline and args.where:
+        results['makeQuantumGraph'] = benchQuantumGraph(args.repo, args.pipeline, args.collection, args.where,
+                                                        args.nRepeat)
+
+    if args.repo and args.visit is not None:
+        results['getWindowedFluxes'] = benchWindowedFluxes(args.repo, args.collection, args.visit, args.nRepeat)
+
+    output = json.dumps(report, indent=2, default=str)
+
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            outputFile.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
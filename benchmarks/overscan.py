@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Benchmark extractFlux.subtractOverscan against the per-amplifier loop, on synthetic windowed raw frames."""
+
+import argparse
+import timeit
+
+import numpy as np
+from drpActor.utils.extractFlux import subtractOverscan
+
+
+def makeGeometry(nAmps, ampWidth=512, overscanWidth=32, nRows=4300):
+    """Amplifiers side by side, each one followed by its horizontal overscan columns."""
+    ampGeometry = []
+
+    for iAmp in range(nAmps):
+        x0 = iAmp * (ampWidth + overscanWidth)
+        rawBox = (0, nRows, x0, x0 + ampWidth + overscanWidth)
+        overscanBox = (0, nRows, x0 + ampWidth, x0 + ampWidth + overscanWidth)
+        ampGeometry.append((rawBox, overscanBox))
+
+    return ampGeometry, (nRows, nAmps * (ampWidth + overscanWidth))
+
+
+def makeFrame(shape, ampGeometry, seed=0):
+    """Synthetic raw frame with a different bias level per amplifier and a few masked pixels."""
+    rng = np.random.default_rng(seed)
+    image = rng.normal(0, 5, size=shape).astype('float32')
+    mask = np.zeros(shape, dtype='int32')
+
+    for iAmp, ((y0, y1, x0, x1), __) in enumerate(ampGeometry):
+        image[y0:y1, x0:x1] += 1000 + 100 * iAmp
+
+    mask[rng.integers(0, shape[0], 100), rng.integers(0, shape[1], 100)] = 1
+    return image, mask
+
+
+def referenceLoop(image, mask, ampGeometry, row0, row1):
+    """Former implementation: full-frame NaN masking then one sliced subtraction per amplifier."""
+    mask[0:row0] = 1
+    mask[row1 + 1:] = 1
+    image[mask != 0] = np.nan
+
+    for (y0, y1, x0, x1), (oy0, oy1, ox0, ox1) in ampGeometry:
+        image[y0:y1, x0:x1] -= np.nanmedian(image[oy0:oy1, ox0:ox1])
+
+
+def batched(image, mask, ampGeometry, row0, row1):
+    """Current implementation, as called from getWindowedFluxes."""
+    mask[0:row0] = 1
+    mask[row1 + 1:] = 1
+    image[0:row0] = np.nan
+    image[row1 + 1:] = np.nan
+    window = image[row0:row1 + 1]
+    window[mask[row0:row1 + 1] != 0] = np.nan
+
+    subtractOverscan(image, ampGeometry, row0, row1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--row0', type=int, default=2000, help='first window row')
+    parser.add_argument('--nRows', type=int, default=100, help='number of window rows')
+    parser.add_argument('--repeat', type=int, default=20, help='number of timed runs')
+    args = parser.parse_args()
+
+    row0, row1 = args.row0, args.row0 + args.nRows - 1
+
+    for nAmps in [4, 8]:
+        ampGeometry, shape = makeGeometry(nAmps)
+        frame, mask = makeFrame(shape, ampGeometry)
+
+        results = dict()
+        for name, func in [('loop', referenceLoop), ('batched', batched)]:
+            image = frame.copy()
+            func(image, mask.copy(), ampGeometry, row0, row1)
+            results[name] = image
+
+            timer = timeit.Timer(lambda: func(frame.copy(), mask.copy(), ampGeometry, row0, row1))
+            copyTimer = timeit.Timer(lambda: (frame.copy(), mask.copy()))
+            elapsed = min(timer.repeat(args.repeat, 1)) - min(copyTimer.repeat(args.repeat, 1))
+            print(f'{nAmps} amps {shape}: {name:>8} {elapsed * 1e3:8.2f} ms')
+
+        same = np.allclose(results['loop'], results['batched'], equal_nan=True)
+        print(f'{nAmps} amps {shape}: results match: {same}')
+
+
+if __name__ == '__main__':
+    main()
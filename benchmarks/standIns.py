@@ -0,0 +1,187 @@
+"""Stand-ins for the Butler, the raw ingest task, the engine and the actor, to benchmark the engine hot paths
+without a real repository nor a hub connection."""
+
+import logging
+import os
+import shutil
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+from drpActor.utils.files import CCDFile, PfsConfigFile
+from drpActor.utils.ingestIndex import IngestionIndex
+from drpActor.utils.pfsVisit import PfsVisit
+from drpActor.utils.tasks.ingest import IngestHandler
+
+
+class StandInCmd:
+    """Collect the generated keywords instead of sending them to the hub."""
+
+    def __init__(self):
+        self.replies = []
+
+    def inform(self, reply):
+        self.replies.append(('i', reply))
+
+    def warn(self, reply):
+        self.replies.append(('w', reply))
+
+
+class StandInActor:
+    """Actor with a logger and a bcast command only."""
+
+    def __init__(self):
+        self.logger = logging.getLogger('benchmarks')
+        self.bcast = StandInCmd()
+
+    def strTraceback(self, e):
+        return str(e)
+
+
+class StandInRegistry:
+    """In-memory registry, answering the `visit IN (visits)` queries issued by IngestionIndex."""
+
+    def __init__(self):
+        self.datasets = dict(raw=[], pfsConfig=[])
+        self.lock = threading.Lock()
+
+    def add(self, datasetType, dataId):
+        with self.lock:
+            self.datasets[datasetType].append(dataId)
+
+        return SimpleNamespace(dataId=dataId)
+
+    def queryDatasets(self, datasetType, where=None, bind=None):
+        visits = set(bind['visits'])
+
+        with self.lock:
+            dataIds = [dataId for dataId in self.datasets[datasetType] if dataId['visit'] in visits]
+
+        return [SimpleNamespace(dataId=dataId) for dataId in dataIds]
+
+
+class StandInButler:
+    """Butler exposing only the registry."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+
+class StandInRawTask:
+    """
+    Raw ingest task transferring the files to a local datastore directory, registering them in the stand-in
+    registry, returning refs as the real task does.
+    """
+
+    def __init__(self, registry, datastoreDir, transfer='copy'):
+        self.registry = registry
+        self.datastoreDir = datastoreDir
+        self.transfer = transfer
+
+    def run(self, pathList):
+        refs = []
+
+        for path in pathList:
+            target = os.path.join(self.datastoreDir, os.path.basename(path))
+
+            if os.path.lexists(target):
+                os.remove(target)
+
+            if self.transfer == 'copy':
+                shutil.copyfile(path, target)
+            else:
+                os.symlink(path, target)
+
+            filename = os.path.basename(path)
+            armNum = CCDFile.toArmNum(filename)
+            dataId = dict(visit=CCDFile.toVisit(filename), arm=CCDFile.fromArmNum[armNum],
+                          spectrograph=CCDFile.toSpecNum(filename))
+            refs.append(self.registry.add('raw', dataId))
+
+        return refs
+
+
+class StandInIngestHandler(IngestHandler):
+    """IngestHandler with the stand-in raw task, and pfsConfig registration instead of the drp_stella ingest."""
+
+    def createRawTask(self):
+        return StandInRawTask(self.engine.registry, self.engine.datastore, transfer=self.engine.ingestMode)
+
+    def ingestPfsConfigFiles(self, pfsVisits):
+        for pfsVisit in pfsVisits:
+            self.engine.registry.add('pfsConfig', dict(visit=pfsVisit.visit))
+
+        self.engine.ingestIndex.refresh([pfsVisit.visit for pfsVisit in pfsVisits], doRaw=False)
+
+        for pfsVisit in pfsVisits:
+            pfsVisit.pfsConfigFile.initialize(self.engine.ingestIndex)
+
+
+class StandInEngine:
+    """Subset of DrpEngine used by the ingest handler and DotRoach."""
+
+    def __init__(self, workDir, ingestMode='copy', ingestChunkSize=200):
+        self.actor = StandInActor()
+        self.datastore = os.path.join(workDir, 'datastore')
+        self.pfsConfigRun = 'PFS/raw/pfsConfig'
+        self.ingestMode = ingestMode
+        self.ingestChunkSize = ingestChunkSize
+        os.makedirs(self.datastore, exist_ok=True)
+
+        self.registry = StandInRegistry()
+        self.rawButler = StandInButler(self.registry)
+        self.pfsConfigButler = self.rawButler
+        self.butler = self.rawButler
+        self.ingestIndex = IngestionIndex(self.rawButler, self.pfsConfigButler)
+        self.ingestHandler = StandInIngestHandler(self)
+
+    @property
+    def logger(self):
+        return self.actor.logger
+
+    @property
+    def bcast(self):
+        return self.actor.bcast
+
+
+def makeSyntheticVisit(rootDir, night, visit, cams, shape=(4300, 4416)):
+    """
+    Write synthetic raw CCD files and a pfsConfig file for a visit, following the PFS file naming.
+
+    Parameters
+    ----------
+    rootDir : str
+        Raw data root directory.
+    night : str
+        Night directory.
+    visit : int
+        Visit identifier.
+    cams : list of str
+        Cameras, e.g. ['b1', 'r1'].
+    shape : tuple, optional
+        Raw image shape, only used to size the files.
+
+    Returns
+    -------
+    PfsVisit
+        Visit with its exposure files and pfsConfig file, not initialized.
+    """
+    spsDir = os.path.join(rootDir, night, 'sps')
+    pfsConfigDir = os.path.join(rootDir, night, 'pfsConfig')
+    os.makedirs(spsDir, exist_ok=True)
+    os.makedirs(pfsConfigDir, exist_ok=True)
+
+    pixels = np.zeros(shape, dtype='uint16')
+    toArmNum = dict([(arm, armNum) for armNum, arm in CCDFile.fromArmNum.items()])
+
+    pfsConfigPath = os.path.join(pfsConfigDir, PfsConfigFile.fileNameFormat % (0, visit))
+    open(pfsConfigPath, 'wb').close()
+    pfsVisit = PfsVisit(visit, pfsConfigFile=PfsConfigFile(visit, filepath=pfsConfigPath))
+
+    for cam in cams:
+        arm, specNum = cam[0], int(cam[1])
+        filename = f'PFSA{visit:06d}{specNum}{toArmNum[arm]}.fits'
+        pixels.tofile(os.path.join(spsDir, filename))
+        pfsVisit.addExposure(CCDFile(rootDir, night, filename))
+
+    return pfsVisit
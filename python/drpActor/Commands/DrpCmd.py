@@ -1,4 +1,3 @@
-import glob
 import os
 from importlib import reload
 
@@ -7,6 +6,7 @@ import drpActor.utils.drpParsing as drpParsing
 import opscore.protocols.keys as keys
 import opscore.protocols.types as types
 from drpActor.utils.files import CCDFile, HxFile, PfsConfigFile
+from drpActor.utils.reactorCmd import ReactorCmd
 
 reload(dotRoach)
 
@@ -28,7 +28,7 @@ class DrpCmd(object):
             ('ping', '', self.ping),
             ('status', '', self.status),
 
-            ('ingest', '<visit> [<spectrograph>] [<arm>] [@(newEngine)]', self.ingest),
+            ('ingest', '<visit> [<spectrograph>] [<arm>] [<chunkSize>] [@(newEngine)]', self.ingest),
             ('reduce', '<where> [@(skipRequireAdjustDetectorMap)] [@(quickCDS)]', self.reduce),
 
             ('startDotRoach', '<dataRoot> <maskFile> <cams> [@(keepMoving)]', self.startDotRoach),
@@ -53,6 +53,8 @@ class DrpCmd(object):
                                         keys.Key("arm", types.String(),
                                                  help="optional arm argument, same parsing as 2d drp pipeline "
                                                       "eg arm=b^r"),
+                                        keys.Key("chunkSize", types.Int(),
+                                                 help="optional maximum number of files per ingest call"),
                                         keys.Key("dataRoot", types.String(),
                                                  help="dataRoot which will contain the generated outputs"),
                                         keys.Key("maskFile", types.String(),
@@ -76,6 +78,12 @@ class DrpCmd(object):
         """Report status and version; obtain and send current data"""
         self.actor.sendVersionKey(cmd)
 
+        if self.engine:
+            self.engine.eventQueue.genStatus(cmd=cmd)
+            self.engine.reduceQueue.genStatus(cmd=cmd)
+            self.engine.ingestQueue.genStatus(cmd=cmd)
+            self.engine.startupTimer.genKeys(cmd)
+
         cmd.inform('text="Present!"')
         cmd.finish()
 
@@ -84,6 +92,11 @@ class DrpCmd(object):
         engine = self.actor.engine if 'newEngine' not in cmdKeys else self.actor.loadDrpEngine()
         return engine
 
+    def releaseEngine(self, engine):
+        """Stop drp engine once the command is done with it, unless it is the actor engine."""
+        if engine is not self.actor.engine:
+            engine.stop()
+
     def ingest(self, cmd):
         """Ingest visits into the configured datastore."""
         cmdKeys = cmd.cmd.keywords
@@ -91,30 +104,57 @@ class DrpCmd(object):
         visits = cmdKeys["visit"].values[0]
         spectrograph = cmdKeys["spectrograph"].values[0] if 'spectrograph' in cmdKeys else None
         arms = cmdKeys["arm"].values[0] if 'arm' in cmdKeys else None
+        chunkSize = cmdKeys["chunkSize"].values[0] if 'chunkSize' in cmdKeys else None
 
-        engine = self.getEngine(cmdKeys)
-
-        visitList = drpParsing.makeVisitList(visits)
+        if chunkSize is not None and chunkSize <= 0:
+            cmd.fail(f'text="chunkSize must be a positive number, got {chunkSize}"')
+            return
 
-        for visit in visitList:
-            try:
-                pfsConfigPath, pattern = drpParsing.makeVisitPattern(visit, spectrograph=spectrograph, arms=arms)
-            except RuntimeError:
-                cmd.warn(f'text="{visit} not found..."')
-                continue
-
-            pfsConfigFile = PfsConfigFile(visit, filepath=pfsConfigPath)
-            engine.newPfsConfig(pfsConfigFile)
-
-            for filepath in glob.glob(pattern):
-                rootNightType, fname = os.path.split(filepath)
-                rootNight, fitsType = os.path.split(rootNightType)
-                root, night = os.path.split(rootNight)
-                File = HxFile if fitsType == 'ramps' else CCDFile
-                engine.newExposure(File(root, night, fname))
+        engine = self.getEngine(cmdKeys)
 
-            pfsVisit = engine.pfsVisits.get(visit)
-            engine.ingestHandler.doIngest(pfsVisit, cmd=cmd)
+        # backfilling from its own queue, so that live keyword events are not held behind it.
+        if not engine.ingestQueue.submit(self.doIngest, ReactorCmd(cmd), engine, visits, spectrograph, arms,
+                                         chunkSize):
+            self.releaseEngine(engine)
+            cmd.fail('text="ingest queue full, try again later"')
+
+    def doIngest(self, cmd, engine, visits, spectrograph, arms, chunkSize):
+        """Resolve the raw files of the requested visits and ingest them, run from the ingest queue."""
+        try:
+            visitList = drpParsing.makeVisitList(visits)
+            # resolving ingestion state for the whole range in one go.
+            engine.ingestIndex.refresh(visitList)
+            # only scanning the nights which changed since the last ingest.
+            engine.rawIndex.refresh()
+            pfsVisits = []
+
+            for visit in visitList:
+                pfsConfigPath, exposurePaths = engine.rawIndex.get(visit)
+
+                if pfsConfigPath is None:
+                    cmd.warn(f'text="{visit} not found..."')
+                    continue
+
+                pfsConfigFile = PfsConfigFile(visit, filepath=pfsConfigPath)
+                engine.newPfsConfig(pfsConfigFile)
+
+                for filepath in drpParsing.selectExposureFiles(exposurePaths, spectrograph=spectrograph, arms=arms):
+                    rootNightType, fname = os.path.split(filepath)
+                    rootNight, fitsType = os.path.split(rootNightType)
+                    root, night = os.path.split(rootNight)
+                    File = HxFile if fitsType == 'ramps' else CCDFile
+                    engine.newExposure(File(root, night, fname))
+
+                pfsVisits.append(engine.pfsVisits.get(visit))
+
+            # ingesting the whole range in chunks of files, rather than visit per visit.
+            engine.ingestHandler.doIngestBatch(pfsVisits, chunkSize=chunkSize, cmd=cmd)
+            engine.visitRetention.apply()
+        except Exception as e:
+            cmd.fail(f'text="{self.actor.strTraceback(e)}"')
+            return
+        finally:
+            self.releaseEngine(engine)
 
         cmd.finish()
 
@@ -136,8 +176,23 @@ class DrpCmd(object):
         engine = self.getEngine(cmdKeys)
         configOverride = dict(reduceExposure={'requireAdjustDetectorMap': requireAdjustDetectorMap},
                               isr={'h4.quickCDS': quickCDS})
-        engine.addConfigOverride(configOverride)
-        engine.runReductionPipeline(where=where)
+
+        # reducing from the reduce queue, never alongside the runs it executes.
+        if not engine.reduceQueue.submit(self.runReduction, ReactorCmd(cmd), engine, where, configOverride,
+                                         barrier=True):
+            self.releaseEngine(engine)
+            cmd.fail('text="reduce queue full, try again later"')
+
+    def runReduction(self, cmd, engine, where, configOverride):
+        """Apply config overrides and run the reduction pipeline, run from the reduce queue."""
+        try:
+            reduction = engine.addConfigOverride(configOverride)
+            engine.runReductionPipeline(where=where, reduction=reduction)
+        except Exception as e:
+            cmd.fail(f'text="{self.actor.strTraceback(e)}"')
+            return
+        finally:
+            self.releaseEngine(engine)
 
         cmd.finish()
 
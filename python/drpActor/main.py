@@ -9,6 +9,7 @@ from importlib import reload
 import drpActor.utils.engine as drpEngine
 from actorcore.Actor import Actor
 from drpActor.utils.files import CCDFile, HxFile, PfsConfigFile
+from drpActor.utils.timing import StageTimer
 from ics.utils.sps.spectroIds import getSite
 from twisted.internet import reactor
 
@@ -58,12 +59,23 @@ class DrpActor(Actor):
 
     def loadDrpEngine(self):
         """ Return DrpEngine object from config file."""
-        reload(drpEngine)
-        return drpEngine.DrpEngine.fromConfigFile(self)
+        startupTimer = StageTimer('startup')
+
+        with startupTimer.stage('import'):
+            reload(drpEngine)
+
+        return drpEngine.DrpEngine.fromConfigFile(self, startupTimer=startupTimer)
 
     def reloadConfiguration(self, cmd):
         """ reload butler"""
+        if self.engine:
+            self.engine.stop()
+
         self.engine = self.loadDrpEngine()
+        self.engine.warmUp()
+
+        self.logger.info(self.engine.startupTimer.summary())
+        self.engine.startupTimer.genKeys(cmd if cmd is not None else self.bcast)
 
     def ccdFilepath(self, keyvar):
         """ CCD Filepath callback"""
@@ -75,7 +87,8 @@ class DrpActor(Actor):
         except ValueError:
             return
 
-        self.engine.newExposure(CCDFile(root, night, fname))
+        exposureFile = CCDFile(root, night, fname)
+        self.engine.eventQueue.submit(self.engine.newExposure, exposureFile, key=exposureFile.visit)
 
     def hxFilepath(self, keyvar):
         """ CCD Filepath callback"""
@@ -91,7 +104,8 @@ class DrpActor(Actor):
         rootNight, fitsType = os.path.split(rootNightType)
         root, night = os.path.split(rootNight)
 
-        self.engine.newExposure(HxFile(root, night, fname))
+        exposureFile = HxFile(root, night, fname)
+        self.engine.eventQueue.submit(self.engine.newExposure, exposureFile, key=exposureFile.visit)
 
     def spsFileIds(self, keyvar):
         """ spsFileIds callback. """
@@ -104,7 +118,7 @@ class DrpActor(Actor):
             return
 
         # delay slightly to enforce time ordering. 1-newExposure 2-newVisit 3-newVisitGroup
-        reactor.callLater(0.2, self.engine.newVisit, visit)
+        reactor.callLater(0.2, self.engine.eventQueue.submit, self.engine.newVisit, visit, key=visit)
 
     def iicSequenceCB(self, keyvar):
         """pfsConfigFinalized callback."""
@@ -118,7 +132,9 @@ class DrpActor(Actor):
 
         if status == 'finished':
             # delay slightly to enforce time ordering. 1-newExposure 2-newVisit 3-newVisitGroup
-            reactor.callLater(0.5, self.engine.newVisitGroup, sequenceId, groupId, sequenceType, name, comments, cmdStr, status, output)
+            # visit group is a barrier: it only starts once every previous visit has been processed.
+            reactor.callLater(0.5, self.engine.eventQueue.submit, self.engine.newVisitGroup, sequenceId, groupId,
+                              sequenceType, name, comments, cmdStr, status, output, barrier=True)
 
     def newPfsConfig(self, keyvar):
         """pfsConfigFinalized callback."""
@@ -130,7 +146,8 @@ class DrpActor(Actor):
         except ValueError:
             return
 
-        self.engine.newPfsConfig(PfsConfigFile.fromKeys(designId, visit, dateDir))
+        pfsConfigFile = PfsConfigFile.fromKeys(designId, visit, dateDir)
+        self.engine.eventQueue.submit(self.engine.newPfsConfig, pfsConfigFile, key=pfsConfigFile.visit)
 
 
 def main():
@@ -0,0 +1,50 @@
+import threading
+
+from lsst.daf.butler import Butler
+
+
+class ButlerFactory:
+    """
+    Open the repository once and hand out lightweight butler views over it.
+
+    All views share the registry (and its SQL connection pool), the datastore and their caches with a single root
+    butler, only the default run and collections differ. This keeps memory and connection count flat, whatever the
+    number of engine components using a butler.
+
+    Parameters
+    ----------
+    datastore : str
+        Path to the datastore (Butler repo root/URI).
+    """
+
+    def __init__(self, datastore):
+        self.datastore = datastore
+        self._root = None
+        self.lock = threading.Lock()
+
+    @property
+    def root(self):
+        """Writeable butler opened on first use, shared by all views."""
+        with self.lock:
+            if self._root is None:
+                self._root = Butler(self.datastore, writeable=True)
+
+            return self._root
+
+    def get(self, run=None, collections=None):
+        """
+        Return a butler view with the given defaults.
+
+        Parameters
+        ----------
+        run : str, optional
+            Default output run.
+        collections : list of str, optional
+            Default input collections, defaults to [run] if only the run is given.
+
+        Returns
+        -------
+        lsst.daf.butler.Butler
+            Butler sharing its registry and datastore with the root butler.
+        """
+        return Butler(butler=self.root, run=run, collections=collections)
@@ -1,45 +1,45 @@
 import logging
-import subprocess
 
+from lsst.daf.butler import CollectionType
 
-def extend_collection_chain(datastore, chain_name, new_run, logger=None):
+
+def extend_collection_chain(butler, chain_name, new_run, logger=None):
     """
-    Use subprocess to call the butler collection-chain command.
+    Append a run to a collection chain through the registry of an already-open butler.
+
+    This is the in-process equivalent of `butler collection-chain <repo> <chain> <run> --mode extend`: the chain and
+    the run are created if they do not exist yet, and the run is appended to the chain atomically, so that concurrent
+    updates from other actors sharing the repository are not lost.
 
     Parameters
     ----------
-    datastore : str
-        Path to the datastore.
+    butler : lsst.daf.butler.Butler
+        Butler instance on the datastore.
     chain_name : str
         Name of the collection chain to extend.
     new_run : str
         Name of the new run collection to add to the chain.
     logger : logging.Logger, optional
         Logger instance to use for logging.
+
+    Raises
+    ------
+    Exception
+        Any registry error is logged and re-raised, the run would otherwise be missing from the chain.
     """
     # If no logger is provided, use the root logger
     if logger is None:
         logger = logging.getLogger(__name__)
 
     try:
-        # Build the command
-        cmd = [
-            "butler",
-            "collection-chain",
-            datastore,
-            chain_name,
-            new_run,
-            "--mode", "extend"
-        ]
-
-        # Execute the command and capture the output
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-
-        # Log the output if successful
-        logger.info(f"Successfully added '{new_run}' to '{chain_name}'.")
-        logger.debug(f"Command output: {result.stdout}")
-
-    except subprocess.CalledProcessError as e:
-        # Log the error if the command fails
-        logger.error(f"Failed to extend collection chain: {e}")
-        logger.debug(f"Error output: {e.stderr}")
+        # registering collections is not allowed within a transaction, both are no-ops if they already exist.
+        butler.collections.register(new_run, CollectionType.RUN)
+        butler.collections.register(chain_name, CollectionType.CHAINED)
+        # the chain is locked while being extended, no read-modify-write.
+        butler.collections.extend_chain(chain_name, new_run)
+    except Exception as e:
+        logger.error(f"Failed to extend collection chain '{chain_name}' with '{new_run}': {e}")
+        raise
+
+    logger.info(f"Successfully added '{new_run}' to '{chain_name}'.")
+    logger.debug(f"Chain children: {list(butler.collections.get_info(chain_name).children)}")
@@ -1,10 +1,12 @@
 import logging
-import multiprocessing
 import os
 import shutil
 import time
 
-import drpActor.utils.extractFlux as extractFlux
+import drpActor.utils.rawWindow as rawWindow
+import drpActor.utils.roachPool as roachPool
+from drpActor.utils.fiberTraceCache import FiberTraceCache
+from drpActor.utils.iterationStore import IterationStore
 import numpy as np
 import pandas as pd
 from pfs.datamodel.pfsConfig import FiberStatus
@@ -15,13 +17,17 @@ class DotRoach(object):
     gfm = pd.DataFrame(FiberIds().data)
     sgfm = gfm[gfm.cobraId != FiberIds.MISSING_VALUE]
     processTimeout = 25 + 120
+    fiberTraceCacheDir = 'fiberTraceCache'  # next to the dotRoach output directories.
 
     def __init__(self, engine, dataRoot, maskFile, cams, keepMoving=False):
         """ Placeholder to handle DotRoach loop"""
         self.engine = engine
-        self.processManager = multiprocessing.Manager()
+        # one long-lived process per camera, started on first iteration.
+        self.pool = roachPool.RoachPool()
 
         self.pathDict = self.initialise(dataRoot)
+        # history stays in memory, each iteration is also saved as a segment and appended to the allIterations csv.
+        self.iterations = IterationStore(dataRoot, legacyCsv=self.pathDict['allIterations'])
         self.maskFile = pd.read_csv(maskFile, index_col=0).sort_values('cobraId')
         self.didOvershoot = self.allStoppedMaskFile()
         self.cams = cams
@@ -34,6 +40,11 @@ class DotRoach(object):
         self.pfsConfig = None
         self.detectorMaps = dict()
         self.fiberTraces = dict()
+        # raw shape per camera for which reading the window straight from the file has been validated.
+        self.rawShapes = dict()
+
+        rootDir, __ = os.path.split(os.path.normpath(dataRoot))
+        self.fiberTraceCache = FiberTraceCache(os.path.join(rootDir, DotRoach.fiberTraceCacheDir))
 
     @property
     def monitoringFiberIds(self):
@@ -56,8 +67,8 @@ class DotRoach(object):
         self.runAway(relevantFiles)
 
     def loadAllIterations(self):
-        """Load allIterations dataframe."""
-        return pd.read_csv(self.pathDict['allIterations'], index_col=0)
+        """Return allIterations dataframe."""
+        return self.iterations.toDataFrame()
 
     def initialise(self, dataRoot):
         """Create output directory and files"""
@@ -71,9 +82,6 @@ class DotRoach(object):
             for newDir in [dataRoot, maskFilesRoot]:
                 os.mkdir(newDir)
 
-            # initialising output file.
-            pd.DataFrame([]).to_csv(outputPath)
-
         return dict(dataRoot=dataRoot, allIterations=outputPath, maskFilesRoot=maskFilesRoot)
 
     def allStoppedMaskFile(self):
@@ -83,44 +91,74 @@ class DotRoach(object):
         return maskFile
 
     def collectFiberData(self, files):
-        """Retrieve pfsArm from butler and return flux estimation for each fiber."""
-        fluxPerFiber = self.processManager.list()
-        jobs = []
+        """Retrieve raw exposures from butler and return flux estimation for each fiber."""
+        futures = []
 
-        def parallelize(exp, dataId, fiberTrace, detectorMap, fluxPerFiber):
-            flux = extractFlux.getWindowedFluxes(exp, dataId, fiberTrace=fiberTrace, detectorMap=detectorMap)
-            fluxPerFiber.append(flux)
-
-        # load fiberTraces on first iteration presumably.
-        if not self.fiberTraces:
+        # load pfsConfig on first iteration presumably.
+        if self.pfsConfig is None:
             self.pfsConfig = self.engine.butler.get('pfsConfig', files[0].dataId)
 
-            for file in files:
-                self.getFiberTrace(file.dataId)
-
         for file in files:
-            fiberTrace, detectorMap = self.getFiberTrace(file.dataId)
-            exp = self.engine.butler.get('raw.exposure', file.dataId)
-            p = multiprocessing.Process(target=parallelize,
-                                        args=(exp.convertF(), file.dataId, fiberTrace, detectorMap, fluxPerFiber))
-            jobs.append(p)
-            p.start()
+            cameraKey = file.dataId['spectrograph'], file.dataId['arm']
+            worker = self.pool.get(cameraKey)
+
+            if worker.loaded and cameraKey in self.rawShapes:
+                window, metadata = self.readRawWindow(file, self.rawShapes[cameraKey])
+                if window is not None:
+                    # only the window rows are shipped to the worker.
+                    futures.append((worker, worker.submit(window, metadata, file.dataId, row0=metadata['W_CDROW0'])))
+                    continue
+
+            exp = self.engine.butler.get('raw.exposure', file.dataId).convertF()
+
+            # fiberTrace and detectorMap are sent only once per camera, they stay resident in the worker.
+            if not worker.loaded:
+                fiberTrace, detectorMap = self.getFiberTrace(file.dataId)
+                worker.load(exp, fiberTrace, detectorMap)
+                self.validateRawWindow(file, exp)
 
-        for proc in jobs:
-            proc.join()
+            metadata = dict([(key, exp.getMetadata()[key]) for key in roachPool.windowKeys])
+            futures.append((worker, worker.submit(exp.image.array, metadata, file.dataId)))
+
+        fluxPerFiber = []
+
+        for worker, future in futures:
+            fiberId, flux = worker.result(future)
+            fluxPerFiber.append(pd.DataFrame(dict(flux=flux, fiberId=fiberId)))
 
         return pd.concat(fluxPerFiber).groupby('fiberId').sum().reset_index()
 
+    def readRawWindow(self, file, shape):
+        """Read the window rows straight from the raw file, return (None, None) if that fails."""
+        try:
+            return rawWindow.readWindow(file.filepath, shape)
+        except Exception as e:
+            logging.warning(f'could not read window from {file.filepath}, falling back to butler: {e}')
+            return None, None
+
+    def validateRawWindow(self, file, exp):
+        """Enable window reads for that camera only if they match the butler raw image within the window."""
+        shape = exp.image.array.shape
+        window, metadata = self.readRawWindow(file, shape)
+
+        if window is None:
+            return
+
+        row0 = metadata['W_CDROW0']
+
+        if np.array_equal(window, exp.image.array[row0:row0 + len(window)]):
+            self.rawShapes[file.dataId['spectrograph'], file.dataId['arm']] = shape
+        else:
+            logging.warning(f'window read from {file.filepath} does not match butler raw, window reads disabled')
+
     def getFiberTrace(self, dataId):
-        """Retrieve fiberTrace"""
+        """Retrieve fiberTrace, from the on-disk cache if it was already built from the same calibs."""
         cameraKey = dataId['spectrograph'], dataId['arm']
 
         if cameraKey not in self.fiberTraces:
-            logging.info(f'making fiberTrace for {cameraKey}')
-            fiberProfiles = self.engine.butler.get("fiberProfiles", dataId)
-            detectorMap = self.engine.butler.get("detectorMap_calib", dataId)
+            fiberTrace, detectorMap = self.fiberTraceCache.get(self.engine.butler, dataId)
             self.detectorMaps[cameraKey] = detectorMap
-            self.fiberTraces[cameraKey] = fiberProfiles.makeFiberTracesFromDetectorMap(detectorMap)
+            self.fiberTraces[cameraKey] = fiberTrace
 
         return self.fiberTraces[cameraKey], self.detectorMaps[cameraKey]
 
@@ -164,14 +202,13 @@ class DotRoach(object):
         # compute normalized flux using monitoring fibers.
         newIter['fluxNorm'] = self.fluxNormalized(newIter)
 
-        # update output file with the new iteration data
-        allIterations = self.process(newIter)
-        allIterations.to_csv(self.pathDict['allIterations'])
+        # append the new iteration data to the store.
+        lastIter = self.process(newIter)
+        self.iterations.append(lastIter)
 
         # export maskFiles for fps
-        nIter = allIterations.nIter.max()
-        lastIter = allIterations.query(f'nIter=={nIter}').sort_values('cobraId')
-        maskFile = toMaskFile(lastIter)
+        nIter = self.iterations.last.nIter.max()
+        maskFile = toMaskFile(self.iterations.last)
         maskFile.to_csv(os.path.join(self.pathDict['maskFilesRoot'], f'iter{nIter}.csv'))
 
     def fluxNormalized(self, newIter):
@@ -192,30 +229,46 @@ class DotRoach(object):
         normFactor = self.normFactor / lampResponse
         return newIter.flux.to_numpy() * normFactor
 
-    def process(self, newIter):
-        """Process new iteration, namely decide which cobras need to stop moving."""
-
-        def shouldIStop(fluxRatio, goalInPhase1=0.003):
-            """"""
-            gradient = fluxRatio[-1] - fluxRatio[-2]
-            gain = gradient / fluxRatio[-1]
-            ratioInPhase1 = fluxRatio[:(self.maxIterInPhase1 + 1)]  # per python excluding upper boundary.
-
-            if self.strategy == 'phase1' and fluxRatio[-1] < goalInPhase1:
-                flag = 1
-            elif self.strategy == 'phase2' and (gain < 0.05 and fluxRatio[-1] < np.min(ratioInPhase1)):
-                flag = 1
-            elif fluxRatio[-2] < 0.5 and gradient > 0:
-                flag = 2
+    def shouldIStop(self, fluxRatio, goalInPhase1=0.003):
+        """
+        Evaluate the stopping rules for all cobras at once.
+
+        Parameters
+        ----------
+        fluxRatio : numpy.ndarray
+            Flux ratio to the first iteration, shape (nIter, nCobra), last row being the new iteration.
+        goalInPhase1 : float, optional
+            Flux ratio goal in phase1.
+
+        Returns
+        -------
+        numpy.ndarray
+            Flag per cobra: 0 keep moving, 1 stop, 2 stop because it has overshot.
+        """
+        last, prev = fluxRatio[-1], fluxRatio[-2]
+        noCobra = np.zeros(last.shape, dtype='bool')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gradient = last - prev
+            gain = gradient / last
+
+            goalReached = last < goalInPhase1 if self.strategy == 'phase1' else noCobra
+
+            if self.strategy == 'phase2':
+                ratioInPhase1 = fluxRatio[:(self.maxIterInPhase1 + 1)]  # per python excluding upper boundary.
+                minInPhase1 = ratioInPhase1.min(axis=0) if len(ratioInPhase1) else np.full(last.shape, np.nan)
+                plateau = np.logical_and(gain < 0.05, last < minInPhase1)
             else:
-                flag = 0
+                plateau = noCobra
 
-            return flag
+            overshoot = np.logical_and(prev < 0.5, gradient > 0)
 
-        allIterations = self.loadAllIterations()
+        return np.select([goalReached, plateau, overshoot], [1, 1, 2], default=0)
 
+    def process(self, newIter):
+        """Process new iteration, namely decide which cobras need to stop moving."""
         # first iteration
-        if allIterations.empty:
+        if self.iterations.empty:
             newIter['keepMoving'] = self.maskFile.bitMask.astype('bool')
             newIter['nIter'] = int(0)
             return newIter
@@ -224,26 +277,32 @@ class DotRoach(object):
         keepMoving = np.ones(len(newIter), dtype='bool')
 
         # logical and with previous iteration
-        lastIter = allIterations.query(f'visit=={allIterations.visit.max()}').sort_values('cobraId')
+        lastIter = self.iterations.last
 
         prevState = lastIter.keepMoving
         keepMoving = np.logical_and(prevState, keepMoving).to_numpy()
         nIter = lastIter.nIter.to_numpy() + 1
 
-        for cobraId, df in allIterations.groupby('cobraId'):
-            df = df.sort_values('nIter')
-            new = newIter.set_index('cobraId').loc[cobraId]
-            iCob = cobraId - 1
-            cobraStopped = not keepMoving[iCob]
-            if cobraStopped:
-                continue
+        # dense flux history, one row per iteration and one column per cobra, the new iteration being the last row.
+        cobraIds = self.iterations.cobraIds
+        newFlux = newIter.set_index('cobraId').fluxNorm.reindex(cobraIds).to_numpy()
+        fluxCobra = self.iterations.historyWith(newFlux)
 
-            fluxCobra = np.append(df.fluxNorm.to_numpy(), new.fluxNorm)
+        # stopped cobras are left untouched.
+        iCob = cobraIds - 1
+        moving = keepMoving[iCob]
+        iCob = iCob[moving]
+        fluxCobra = fluxCobra[:, moving]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
             fluxRatio = fluxCobra / fluxCobra[0]
-            flag = shouldIStop(fluxRatio)
 
-            self.didOvershoot.bitMask[iCob] = int(flag == 2)
-            keepMoving[iCob] = flag == 0
+        flag = self.shouldIStop(fluxRatio)
+
+        didOvershoot = self.didOvershoot.bitMask.to_numpy().copy()
+        didOvershoot[iCob] = (flag == 2).astype('int')
+        self.didOvershoot['bitMask'] = didOvershoot
+        keepMoving[iCob] = flag == 0
 
         if self.phase == 'phase1->phase2':
             self.maxIterInPhase1 = max(nIter)
@@ -257,20 +316,22 @@ class DotRoach(object):
         newIter['keepMoving'] = keepMoving
         newIter['nIter'] = nIter
 
-        # append to current allIterations
-        allIterations = pd.concat([allIterations, newIter]).reset_index(drop=True)
-        return allIterations
+        return newIter
 
     def finish(self):
         """ """
+        self.pool.close()
+
         rootDir, __ = os.path.split(self.pathDict["dataRoot"])
-        try:
-            # renaming current to dedicated path.
-            visitMin = self.loadAllIterations().visit.min()
-            os.rename(self.pathDict["dataRoot"], os.path.join(rootDir, f'v{str(visitMin).zfill(6)}'))
-        except:
+
+        if self.iterations.empty:
             # no visit has been analysed you can remove it.
             shutil.rmtree(self.pathDict["dataRoot"])
+            return
+
+        # legacy csv is kept up to date by the store, rename current to dedicated path.
+        visitMin = self.loadAllIterations().visit.min()
+        os.rename(self.pathDict["dataRoot"], os.path.join(rootDir, f'v{str(visitMin).zfill(6)}'))
 
     def phase2(self):
         """"""
@@ -298,8 +359,7 @@ class DotRoach(object):
         """ """
         cmd.inform(f"dotRoach={self.pathDict['allIterations']}")
 
-        allIterations = self.loadAllIterations()
-        lastVisit = allIterations.visit.max()
-        lastIter = allIterations.query(f'visit=={lastVisit}').sort_values('cobraId')
+        lastIter = self.iterations.last
+        lastVisit = lastIter.visit.max()
 
         cmd.inform(f'text="visit={lastVisit}, nCobraKeepMoving={len(lastIter[lastIter.keepMoving])}"')
@@ -1,6 +1,7 @@
 import glob
 import os
 
+from drpActor.utils.files import PfsFile
 from ics.utils.sps.spectroIds import SpectroIds
 
 
@@ -79,3 +80,34 @@ def makeVisitPattern(visit, spectrograph=None, arms=None):
     armNumPattern = makeArmNumPattern(arms)
 
     return pfsConfigPath, f'{rootDir}/*/PFS[A-B]{visit:06d}{specNumPattern}{armNumPattern}.fits'
+
+
+def selectExposureFiles(filepaths, spectrograph=None, arms=None):
+    """
+    Select the exposure files matching the given spectrograph(s) and arm(s).
+
+    Parameters:
+    filepaths (list): Exposure file paths.
+    spectrograph (str or None): A string of spectrograph numbers to match, separated by '^', or None to match all.
+    arms (str or None): A string of arm names to match, separated by '^', or None to match all arms.
+
+    Returns:
+    list: The matching file paths.
+    """
+    specNums = set(map(int, spectrograph.split('^'))) if spectrograph else None
+    armNums = set([SpectroIds.validArms[arm] for arm in arms.split('^')]) if arms else None
+
+    selected = []
+
+    for filepath in filepaths:
+        filename = os.path.basename(filepath)
+
+        if specNums is not None and PfsFile.toSpecNum(filename) not in specNums:
+            continue
+
+        if armNums is not None and PfsFile.toArmNum(filename) not in armNums:
+            continue
+
+        selected.append(filepath)
+
+    return selected
@@ -1,16 +1,27 @@
 import datetime
 import os
+import threading
 from datetime import timezone
 from importlib import reload
 import time
+from functools import partial
 
 import drpActor.utils.dotRoach as dotRoach
 
 reload(dotRoach)
 
-from lsst.daf.butler import Butler
+from drpActor.utils.butlerFactory import ButlerFactory
+from drpActor.utils.ingestIndex import IngestionIndex
+from drpActor.utils.files import PfsConfigFile
 from drpActor.utils.pfsVisit import PfsVisit
+from drpActor.utils.quantumPool import QuantumWorkerPool
+from drpActor.utils.rawIndex import RawDataIndex
+from drpActor.utils.reactorCmd import ReactorCmd
+from drpActor.utils.reduction import ReductionRun, ReductionRunCache
 from drpActor.utils.tasks.ingest import IngestHandler
+from drpActor.utils.timing import StageTimer, VisitMetrics
+from drpActor.utils.visitRetention import VisitRetention
+from drpActor.utils.workQueue import WorkQueue
 from lsst.pipe.base.separable_pipeline_executor import SeparablePipelineExecutor
 from lsst.pipe.base import Pipeline, ExecutionResources
 from drpActor.utils.chainedCollection import extend_collection_chain
@@ -45,6 +56,8 @@ class DrpEngine:
         Output collection where task products are written.
     ingestMode : str
         Ingestion mode ("link" or "copy").
+    ingestChunkSize : int, optional
+        Maximum number of files per ingest call when ingesting a range of visits.
     pipelineYaml : str
         Path to the pipeline YAML (tasks/configs/contracts), typically under $PFS_INSTDATA_DIR/config.
     groupVisit : bool
@@ -60,19 +73,48 @@ class DrpEngine:
     lsstLog : dict
         LSST logging configuration (e.g., {"level": 10, "long_log": False}).
     detrendCallback : dict
-        Detrend-key callback configuration (e.g., {"activated": False, "useSilentThread": True,
-        "waitInterval": 1, "timeout": 90}).
+        Detrend-key callback configuration (e.g., {"activated": False}), detrend keys are generated from the isr
+        quanta outputs as soon as they complete.
+    runCacheSize : int, optional
+        Number of configured reduction runs (one per distinct config override) kept for reuse.
+    scheduling : dict, optional
+        Work queue configuration, per stage (e.g., {"events": {"nWorkers": 1}, "reduce": {"nWorkers": 1,
+        "maxQueueSize": 50}, "ingest": {"maxQueueSize": 10}}), the event queue is unbounded by default so that no
+        keyword event is ever dropped.
+    metrics : dict, optional
+        Per-visit metrics configuration (e.g., {"path": "/data/logs/actors/drp/metrics.jsonl"}), stage timings are
+        always published as keywords, and also appended to that JSON lines file if a path is given.
+    retention : dict, optional
+        PfsVisit retention configuration (e.g., {"maxVisits": 500, "keepCurrentNight": True,
+        "journal": "/data/drp/visits.jsonl"}), older visits are evicted once done and journaled.
+    rawIndex : dict, optional
+        Raw data index configuration (e.g., {"path": "/data/drp/rawIndex.json", "saveDelay": 10}), the index of the
+        raw files is persisted to that file if given.
+    warmStart : bool, optional
+        If True, the reduction pipeline is set up and resolved, and the worker processes are started, in background
+        threads, so that the engine can handle file keywords right away; the first reduction waits for it if
+        needed.
+    startupTimer : StageTimer, optional
+        Timer recording the time spent in each startup phase, created if not provided.
 
     Notes
     -----
-    - `numProc` controls **process** parallelism at the executor level.
+    - `numProc` sizes the persistent pool of worker processes executing quanta, reused across visits.
     - `taskThreads` controls **per-quantum** threading; keep 1 unless explicitly tuned.
     - When fail_fast is True, the first task failure stops further execution in the current run.
+    - Keyword callbacks only enqueue events in `eventQueue`; ingestion and quantum graph generation run in its
+      worker threads, never on the twisted reactor.
+    - Quantum graph execution runs in `reduceQueue`, so that visit N+1 is ingested while visit N is reduced.
+    - Bulk ingestion commands run in `ingestQueue`, so that a backfill never holds live keyword events behind it.
     """
 
     def __init__(self, actor, datastore, rawRun, pfsConfigRun, inputCollection, outputCollection, ingestMode,
-                 pipelineYaml, groupVisit, fail_fast, numProc, taskThreads, clobberOutput, lsstLog, detrendCallback):
+                 pipelineYaml, groupVisit, fail_fast, numProc, taskThreads, clobberOutput, lsstLog, detrendCallback,
+                 runCacheSize=4, ingestChunkSize=200, scheduling=None, metrics=None, retention=None, rawIndex=None,
+                 warmStart=False, startupTimer=None):
         """Lightweight init; heavy setup happens in dedicated methods."""
+        self.startupTimer = startupTimer if startupTimer is not None else StageTimer('startup')
+        self.warmStart = warmStart  # set up the pipeline and the worker pool in the background.
         self.actor = actor  # actor-provided logger/config access
         self.datastore = datastore  # butler repo root/URI
         self.rawRun = rawRun  # run for raw exposures
@@ -80,9 +122,11 @@ class DrpEngine:
         self.inputCollection = inputCollection  # read collection for pipeline inputs
         self.outputCollection = outputCollection  # write collection for pipeline outputs
         self.ingestMode = ingestMode  # ingestion policy selector
+        self.ingestChunkSize = ingestChunkSize  # files per ingest call for batched ingestion
         self.pipelineYaml = pipelineYaml  # pipeline yaml file path
         self.groupVisit = groupVisit  # reduce visits as a group.
         self.fail_fast = fail_fast  # run pipeline in fail_fast mode.
+        self.reductionCache = ReductionRunCache(maxSize=runCacheSize)  # config override -> ReductionRun
 
         # execution/logging/callback options
         self.numProc = numProc  # number of worker processes (process-level parallelism)
@@ -91,36 +135,97 @@ class DrpEngine:
         self.lsstLog = lsstLog if lsstLog is not None else {}
         self.detrendCallback = detrendCallback
         self.doGenDetrendKey = detrendCallback.get('activated', False)
-
-        self.pfsVisits = {}  # visitId -> list of exposure ids
+        self.scheduling = scheduling if scheduling is not None else {}
+        metrics = metrics if metrics is not None else {}
+        self.metrics = VisitMetrics(self, path=metrics.get('path'))
+
+        self.pfsVisits = {}  # visitId -> PfsVisit
+        self.visitRetention = VisitRetention(self, **(retention if retention is not None else {}))
+        rawIndex = rawIndex if rawIndex is not None else {}
+        self.rawIndex = RawDataIndex(PfsConfigFile.rootDir, **rawIndex)
         self.rawButler = None  # butler for raw/ingest operations
         self.dotRoach = None
         self.configOverride = None  # no config override yet.
+        self.overrideLock = threading.Lock()  # switching runs happens from both the event and the reduce queues.
+        self.quantumCallbacks = [self.genDetrendKey]  # called for each completed quantum.
 
         # Enable auto-ingest and auto-reduction by default
         self.doAutoIngest = True
         self.doAutoReduce = True
 
-        # Initialize Butler instances and handlers
-        self.rawButler = self.loadButler(self.rawRun)
-        self.pfsConfigButler = self.loadButler(self.pfsConfigRun)
-        self.butler = Butler(self.datastore, collections=[self.inputCollection, self.outputCollection])
-
-        self.ingestHandler = IngestHandler(self)
-        self.reducePipeline, self.reduceButler, self.executor, self.timestamp = self.setupReducePipeline(datastore,
-                                                                                                         inputCollection,
-                                                                                                         outputCollection,
-                                                                                                         pipelineYaml,
-                                                                                                         taskThreads)
+        # Initialize Butler instances and handlers, all sharing the same registry connection pool.
+        with self.startupTimer.stage('butler'):
+            self.butlerFactory = ButlerFactory(self.datastore)
+            self.rawButler = self.loadButler(self.rawRun)
+            self.pfsConfigButler = self.loadButler(self.pfsConfigRun)
+            self.butler = self.butlerFactory.get(collections=[self.inputCollection, self.outputCollection])
+            self.ingestIndex = IngestionIndex(self.rawButler, self.pfsConfigButler)
+
+        with self.startupTimer.stage('ingest'):
+            self.ingestHandler = IngestHandler(self)
+
+        # initial reduction run, possibly set up in the background.
+        self._reduction = None
+        self._reductionError = None
+        self.reductionReady = threading.Event()
+
+        if warmStart:
+            threading.Thread(target=self.setupInitialReduction, kwargs=dict(logSummary=True), name='warmStart',
+                             daemon=True).start()
+        else:
+            self.setupInitialReduction()
+            if self._reductionError is not None:
+                raise self._reductionError
+
         self.condaEnv = os.environ.get("CONDA_DEFAULT_ENV")
+        # long-lived worker processes, started on first use or by warmUp.
+        self.workerPool = QuantumWorkerPool(self, numProc=numProc, taskThreads=taskThreads, maxButlers=runCacheSize)
+
+        # events are processed in a worker thread, one at a time by default, as they used to be on the reactor.
+        # keyword events are never rejected, they would be lost for good.
+        eventConfig = dict(nWorkers=1, maxQueueSize=None)
+        eventConfig.update(self.scheduling.get('events', {}))
+        self.eventQueue = WorkQueue(self, 'events', **eventConfig)
+        # quantum graph execution is pipelined in its own queue, one run at a time by default.
+        reduceConfig = dict(nWorkers=1)
+        reduceConfig.update(self.scheduling.get('reduce', {}))
+        self.reduceQueue = WorkQueue(self, 'reduce', **reduceConfig)
+        # bulk ingestion commands, kept out of the live event queue.
+        ingestConfig = dict(nWorkers=1, maxQueueSize=10)
+        ingestConfig.update(self.scheduling.get('ingest', {}))
+        self.ingestQueue = WorkQueue(self, 'ingest', **ingestConfig)
 
     @property
     def logger(self):
         """Retrieve the logger instance from the actor."""
         return self.actor.logger
 
+    @property
+    def bcast(self):
+        """Actor bcast, replies being sent from the reactor thread."""
+        return ReactorCmd(self.actor.bcast)
+
+    @property
+    def reduction(self):
+        """Current reduction run, waiting for the initial one to be set up if needed."""
+        self.reductionReady.wait()
+
+        if self._reduction is None:
+            raise RuntimeError(f'reduction pipeline could not be set up: {self._reductionError}')
+
+        return self._reduction
+
+    @reduction.setter
+    def reduction(self, reduction):
+        self._reduction = reduction
+
+    @property
+    def timestamp(self):
+        """Timestamp of the current reduction run."""
+        return self.reduction.timestamp
+
     @classmethod
-    def fromConfigFile(cls, actor):
+    def fromConfigFile(cls, actor, startupTimer=None):
         """Create a DrpEngine instance from the actor's configuration file."""
         # loading per-site config
         siteConfig = actor.actorConfig[actor.site].get('engine')
@@ -136,12 +241,14 @@ class DrpEngine:
         # ingest config
         ingest = siteConfig.get('ingest')
         ingestMode = ingest.get('mode')
+        ingestChunkSize = ingest.get('chunkSize', 200)
 
         # pipeline config
         pipeline = siteConfig.get('pipeline')
         pipelineYaml = pipeline.get('yaml')
         groupVisit = pipeline.get('groupVisit')
         fail_fast = pipeline.get('fail_fast')
+        runCacheSize = pipeline.get('runCacheSize', 4)
 
         # execution, numProc
         execution = siteConfig.get('execution')
@@ -157,6 +264,15 @@ class DrpEngine:
         lsstLog = siteConfig.get('lsstLog')
         detrendCallback = siteConfig.get('detrendCallback')
 
+        # work queues
+        scheduling = siteConfig.get('scheduling', dict())
+        warmStart = pipeline.get('warmStart', False)
+
+        # per-visit metrics and retention
+        metrics = siteConfig.get('metrics', dict())
+        retention = siteConfig.get('retention', dict())
+        rawIndex = siteConfig.get('rawIndex', dict())
+
         return cls(actor,
                    datastore=datastore,
                    rawRun=rawRun,
@@ -167,15 +283,23 @@ class DrpEngine:
                    pipelineYaml=pipelineYaml,
                    groupVisit=groupVisit,
                    fail_fast=fail_fast,
+                   runCacheSize=runCacheSize,
                    numProc=numProc,
                    taskThreads=taskThreads,
                    clobberOutput=clobberOutput,
                    lsstLog=lsstLog,
-                   detrendCallback=detrendCallback)
+                   detrendCallback=detrendCallback,
+                   ingestChunkSize=ingestChunkSize,
+                   scheduling=scheduling,
+                   metrics=metrics,
+                   retention=retention,
+                   rawIndex=rawIndex,
+                   warmStart=warmStart,
+                   startupTimer=startupTimer)
 
     def loadButler(self, run):
         """
-        Initialize a Butler instance for a specific run.
+        Initialize a Butler view for a specific run, over the shared repository connection.
 
         Parameters
         ----------
@@ -188,19 +312,36 @@ class DrpEngine:
             The initialized Butler instance or None if initialization fails.
         """
         try:
-            return Butler(self.datastore, run=run)
+            return self.butlerFactory.get(run=run)
         except Exception as e:
             self.logger.warning('Failed to load Butler: %s', self.actor.strTraceback(e))
             return None
 
-    def setupReducePipeline(self, datastore, inputCollection, chainedCollection, pipelineYaml, taskThreads=1):
+    def setupInitialReduction(self, logSummary=False):
+        """Set up the initial reduction run and resolve its pipeline graph, timed as the pipeline startup phase."""
+        try:
+            with self.startupTimer.stage('pipeline'):
+                reduction = self.setupReducePipeline(self.inputCollection, self.outputCollection, self.pipelineYaml,
+                                                     self.taskThreads)
+                # importing the tasks and resolving the dataset types now rather than on the first visit.
+                reduction.pipelineGraph
+
+            self._reduction = reduction
+        except Exception as e:
+            self._reductionError = e
+            self.logger.warning('Failed to set up reduction pipeline: %s', self.actor.strTraceback(e))
+        finally:
+            self.reductionReady.set()
+
+        if logSummary:
+            self.logger.info(self.startupTimer.summary())
+
+    def setupReducePipeline(self, inputCollection, chainedCollection, pipelineYaml, taskThreads=1):
         """
         Set up the reduction pipeline and its executor.
 
         Parameters
         ----------
-        datastore : str
-            Path to the datastore (Butler repo root/URI).
         inputCollection : str
             Name of the input collection.
         chainedCollection : str
@@ -212,12 +353,12 @@ class DrpEngine:
 
         Returns
         -------
-        tuple
-            (pipeline, butler, executor, timestamp)
+        ReductionRun
+            Pipeline, butler, executor and timestamp of the new run.
 
         Notes
         -----
-        - Use `self.numProc` later with `run_pipeline(..., num_proc=self.numProc)` to control process concurrency.
+        - Process concurrency is controlled by `self.numProc`, the size of the persistent quantum worker pool.
         - `taskThreads` only affects intra-quantum threading; keep 1 when BLAS/OpenMP are pinned to 1.
         """
         # Load the reduction pipeline from YAML
@@ -228,16 +369,39 @@ class DrpEngine:
         run = os.path.join(chainedCollection, timestamp)
 
         # Initialize the Butler with the input and output collections
-        butler = Butler(datastore, collections=[inputCollection], run=run)
+        butler = self.butlerFactory.get(run=run, collections=[inputCollection])
 
-        # extend collection chaine
-        extend_collection_chain(datastore, chainedCollection, run, logger=self.logger)
+        # extend collection chain, in-process and atomically through the butler.
+        extend_collection_chain(butler, chainedCollection, run, logger=self.logger)
 
         # Set up the pipeline executor for parallel processing
         executor = SeparablePipelineExecutor(butler=butler, clobber_output=True,
                                              resources=ExecutionResources(num_cores=taskThreads))
 
-        return pipeline, butler, executor, timestamp
+        return ReductionRun(pipeline, butler, executor, timestamp)
+
+    def stop(self):
+        """Stop engine worker threads and processes, pending events are dropped."""
+        self.eventQueue.stop()
+        self.reduceQueue.stop()
+        self.ingestQueue.stop()
+        self.workerPool.shutdown()
+
+    def warmUp(self):
+        """Start the quantum worker processes ahead of the first reduction, in the background in warm-start mode."""
+        if self.warmStart:
+            threading.Thread(target=self.startWorkerPool, kwargs=dict(logSummary=True), name='workerPoolWarmUp',
+                             daemon=True).start()
+        else:
+            self.startWorkerPool()
+
+    def startWorkerPool(self, logSummary=False):
+        """Start the quantum worker processes and wait for them to be ready, timed as the workerPool startup phase."""
+        with self.startupTimer.stage('workerPool'):
+            self.workerPool.start(waitReady=True)
+
+        if logSummary:
+            self.logger.info(self.startupTimer.summary())
 
     def newPfsConfig(self, pfsConfigFile):
         """
@@ -249,7 +413,10 @@ class DrpEngine:
             The PFS configuration file to be registered.
         """
         self.logger.info(f'New pfsConfig available: {pfsConfigFile.filepath}')
-        pfsConfigFile.initialize(self.pfsConfigButler)
+        pfsConfigFile.initialize(self.ingestIndex)
+
+        if pfsConfigFile.filepath is not None:
+            self.rawIndex.addPfsConfig(pfsConfigFile.visit, pfsConfigFile.filepath)
 
         self.pfsVisits[pfsConfigFile.visit] = PfsVisit(pfsConfigFile.visit, pfsConfigFile=pfsConfigFile)
 
@@ -262,14 +429,21 @@ class DrpEngine:
         exposureFile : object
             The exposure file to be added to a visit.
         """
-        self.logger.info(f'New exposure available: {exposureFile.filepath}')
-        exposureFile.initialize(self.rawButler)
-
         if exposureFile.visit not in self.pfsVisits:
             self.logger.warning(f'No pfsVisit found for visit {exposureFile.visit}')
             self.pfsVisits[exposureFile.visit] = PfsVisit(exposureFile.visit)
 
-        self.pfsVisits[exposureFile.visit].addExposure(exposureFile)
+        pfsVisit = self.pfsVisits[exposureFile.visit]
+
+        # re-broadcast keyword, nothing new.
+        if pfsVisit.hasExposure(exposureFile):
+            self.logger.info(f'Exposure already known: {exposureFile.filepath}')
+            return
+
+        self.logger.info(f'New exposure available: {exposureFile.filepath}')
+        exposureFile.initialize(self.ingestIndex)
+        pfsVisit.addExposure(exposureFile)
+        self.rawIndex.addExposure(exposureFile.visit, exposureFile.filepath)
 
     def newVisit(self, visit):
         """
@@ -286,6 +460,7 @@ class DrpEngine:
             self.logger.warning(f'No pfsVisit found for visit {visit}')
             return
 
+        self.addWaitTime([visit], self.eventQueue, 'eventWait')
         self.processPfsVisit(pfsVisit)
 
     def newVisitGroup(self, sequenceId, groupId, sequenceType, name, comments, cmdStr, status, output):
@@ -379,50 +554,81 @@ class DrpEngine:
                                   isr={'h4.quickCDS': quickCDS},
                                   cosmicray={'doNormalizeChiRms': doNormalizeChiRms})
 
-            self.addConfigOverride(configOverride)
+            reduction = self.addConfigOverride(configOverride)
 
-            self.processVisitGroup(pfsVisits)
+            self.processVisitGroup(pfsVisits, reduction=reduction)
 
     def processPfsVisit(self, pfsVisit):
         """
         Ingest and reduce data for a single PFS visit, including optional callbacks and tools.
 
+        The quantum graph is built right after ingestion, while its execution is handed to the reduce queue, so that
+        the next visit can be ingested and have its graph built while this one is still being reduced.
+
         Parameters
         ----------
         pfsVisit : PfsVisit
             The visit object containing exposures and configurations.
         """
         if self.doAutoIngest:
-            self.ingestHandler.doIngest(pfsVisit)
+            with self.metrics.stage(pfsVisit.visit, 'ingest'):
+                self.ingestHandler.doIngest(pfsVisit)
 
         if pfsVisit.isIngested and not self.groupVisit:
             if self.doAutoReduce:
-                # setting up a callback to be generated when the file is generated.
-                if self.doGenDetrendKey:
-                    pfsVisit.setupDetrendCallback(self)
+                where = f"visit={pfsVisit.visit}"
+
+                with self.metrics.stage(pfsVisit.visit, 'qgBuild'):
+                    quantumGraph = self.makeQuantumGraph(where=where)
 
-                # Running the pipeline for that visit.
-                self.runReductionPipeline(where=f"visit={pfsVisit.visit}")
+                if quantumGraph is not None:
+                    # pfsVisit will be finished once executed.
+                    if self.reduceQueue.submit(self.executePfsVisit, pfsVisit, *quantumGraph, where=where):
+                        return
 
             # run roaches ! run !
             if self.dotRoach is not None:
-                self.dotRoach.run(pfsVisit)
+                with self.metrics.stage(pfsVisit.visit, 'dotRoach'):
+                    self.dotRoach.run(pfsVisit)
 
-        # Just declaring that visit should be processed, just a placeholder for now.
-        pfsVisit.finish()
+        self.finishPfsVisit(pfsVisit)
+
+    def executePfsVisit(self, pfsVisit, reduction, quantumGraph, where):
+        """
+        Execute the quantum graph of a single PFS visit and finalize it, run from the reduce queue.
+
+        Parameters
+        ----------
+        pfsVisit : PfsVisit
+            The visit object containing exposures and configurations.
+        reduction : ReductionRun
+            Reduction run which built the quantum graph.
+        quantumGraph : QuantumGraph
+            Quantum graph to execute.
+        where : str
+            Query which was used to build the graph, for logging.
+        """
+        self.addWaitTime([pfsVisit.visit], self.reduceQueue, 'reduceWait')
+
+        try:
+            self.executeQuantumGraph(reduction, quantumGraph, where=where, visits=[pfsVisit.visit])
+        finally:
+            self.finishPfsVisit(pfsVisit)
 
-    def processVisitGroup(self, pfsVisits):
+    def processVisitGroup(self, pfsVisits, reduction=None):
         """
         Reduce a group of already ingested PFS visits in one pipeline execution and finalize them.
 
         The input visits are assumed to exist in self.pfsVisits and be marked ingested (validated by newVisitGroup).
-        The method logs the visit IDs, runs the reduction pipeline once with a "visit in (...)" WHERE clause, then
-        calls finish() on each PfsVisit regardless of pipeline outcome.
+        The method logs the visit IDs and builds the quantum graph with a "visit in (...)" WHERE clause, execution is
+        then handed to the reduce queue, which calls finish() on each PfsVisit regardless of pipeline outcome.
 
         Parameters
         ----------
         pfsVisits : list[PfsVisit]
             Visits to process together.
+        reduction : ReductionRun, optional
+            Reduction run configured for that group, defaults to the current one.
 
         Notes
         -----
@@ -430,64 +636,265 @@ class DrpEngine:
         - Any pipeline exception is logged upstream; this method still attempts to finish all visits.
         """
         visitStr = ','.join(str(p.visit) for p in pfsVisits)
+        where = f"visit in ({visitStr})"
 
         self.logger.info(f'processVisitGroup started on {visitStr}')
-        t0 = time.perf_counter()
-        self.runReductionPipeline(where=f"visit in ({visitStr})")
-        t1 = time.perf_counter()
+        visits = [p.visit for p in pfsVisits]
+        self.addWaitTime(visits, self.eventQueue, 'eventWait')
 
-        cmd = self.actor.bcast
+        start = time.time()
+        quantumGraph = self.makeQuantumGraph(where=where, reduction=reduction)
+        self.metrics.add(visits, 'qgBuild', time.time() - start)
 
-        for p in pfsVisits:
-            p.finish()
-            cmd.inform(f'reduceExposureStatus={p.visit},0,"OK",{t1 - t0:.1f}')
+        if quantumGraph is None or not self.reduceQueue.submit(self.executeVisitGroup, pfsVisits, *quantumGraph,
+                                                               where=where):
+            for p in pfsVisits:
+                self.finishPfsVisit(p)
 
+    def executeVisitGroup(self, pfsVisits, reduction, quantumGraph, where):
+        """
+        Execute the quantum graph of a group of visits and finalize them, run from the reduce queue.
 
-    def runReductionPipeline(self, where):
+        Parameters
+        ----------
+        pfsVisits : list[PfsVisit]
+            Visits processed together.
+        reduction : ReductionRun
+            Reduction run which built the quantum graph.
+        quantumGraph : QuantumGraph
+            Quantum graph to execute.
+        where : str
+            Query which was used to build the graph, for logging.
         """
-        Execute the reduction pipeline for a given visit.
+        visits = [p.visit for p in pfsVisits]
+        self.addWaitTime(visits, self.reduceQueue, 'reduceWait')
+
+        t0 = time.time()
+        returnCode, status = 1, 'FAILED'
+
+        try:
+            self.executeQuantumGraph(reduction, quantumGraph, where=where, visits=visits)
+            returnCode, status = 0, 'OK'
+        finally:
+            t1 = time.time()
+
+            cmd = self.bcast
+            genStatus = cmd.inform if not returnCode else cmd.warn
+
+            for p in pfsVisits:
+                # each visit is done with its own last quantum, not with the whole group.
+                reduceTime = self.metrics.reduceTime(p.visit, t0, t1)
+                genStatus(f'reduceExposureStatus={p.visit},{returnCode},"{status}",{reduceTime:.1f}')
+                self.finishPfsVisit(p)
+
+    def addWaitTime(self, visits, queue, stage):
+        """Record the time the job being executed from `queue` spent waiting, as a stage of each visit."""
+        job = queue.currentJob
+
+        if job is not None and job.waitTime is not None:
+            self.metrics.add(visits, stage, job.waitTime)
+
+    def finishPfsVisit(self, pfsVisit):
+        """Finalize a visit, publish its stage timings and evict visits past the retention window."""
+        pfsVisit.finish()
+        self.metrics.publish(pfsVisit.visit)
+        self.visitRetention.apply()
+
+    def makeQuantumGraph(self, where, reduction=None):
+        """
+        Build the quantum graph for a given query within a reduction run.
 
         Parameters
         ----------
         where : str
-            Query to filter the data for the specific visit.
+            Query to filter the data to reduce.
+        reduction : ReductionRun, optional
+            Reduction run to build the graph with, defaults to the current one.
+
+        Returns
+        -------
+        tuple or None
+            (reduction, quantumGraph), the graph has to be executed within the run which built it. None if the
+            graph could not be built.
         """
+        if reduction is None:
+            with self.overrideLock:
+                reduction = self.reduction
+
         try:
-            quantumGraph = self.executor.make_quantum_graph(pipeline=self.reducePipeline, where=where)
+            quantumGraph = reduction.makeQuantumGraph(where=where)
         except Exception as e:
             self.logger.exception(e)
-            return
+            return None
 
-        self.executor.pre_execute_qgraph(quantumGraph)
+        return reduction, quantumGraph
 
+    def executeQuantumGraph(self, reduction, quantumGraph, where, visits=()):
+        """
+        Execute a quantum graph.
+
+        Parameters
+        ----------
+        reduction : ReductionRun
+            Reduction run which built the quantum graph.
+        quantumGraph : QuantumGraph
+            Quantum graph to execute.
+        where : str
+            Query which was used to build the graph, for logging.
+        visits : list of int, optional
+            Visits reduced by this graph, stage timings are recorded for them.
+        """
         self.logger.info(f'run_pipeline where="{where}" num_proc={self.numProc} fail_fast={self.fail_fast}')
-        # passing down num_proc for the most recent version.
-        self.executor.run_pipeline(graph=quantumGraph, num_proc=self.numProc, fail_fast=self.fail_fast)
+
+        # init-outputs are only written for the first graph of a run.
+        start = time.time()
+        reduction.preExecute(quantumGraph)
+        self.metrics.add(visits, 'preExecute', time.time() - start)
+
+        # quanta go to the persistent worker pool.
+        start = time.time()
+        try:
+            reduction.execute(quantumGraph, workerPool=self.workerPool, failFast=self.fail_fast,
+                              callback=partial(self.onQuantumDone, reduction, visits))
+        finally:
+            self.metrics.add(visits, 'execute', time.time() - start)
+
+    def addQuantumCallback(self, callback):
+        """
+        Register a function to be called each time a quantum completes successfully.
+
+        Parameters
+        ----------
+        callback : callable
+            Called as callback(label, dataId, refs, butler), refs being the output DatasetRefs of the quantum, some
+            optional outputs may not have been written, URIs are resolved through the butler only when needed.
+        """
+        self.quantumCallbacks.append(callback)
+
+    def onQuantumDone(self, reduction, visits, node, duration):
+        """
+        Dispatch the outputs of a completed quantum to the quantum callbacks.
+
+        Parameters
+        ----------
+        reduction : ReductionRun
+            Reduction run which executed the quantum.
+        visits : list of int
+            Visits reduced by the quantum graph, the quantum is accounted to its own visit if it has one, to all of
+            them otherwise.
+        node : lsst.pipe.base.QuantumNode
+            Quantum graph node which just completed.
+        duration : float
+            Quantum execution time in seconds.
+        """
+        start = time.time()
+        label = node.task_node.label
+        refs = [ref for outputRefs in node.quantum.outputs.values() for ref in outputRefs]
+
+        try:
+            visits = [node.quantum.dataId['visit']] if visits else visits
+        except KeyError:
+            pass
+
+        self.metrics.quantumDone(visits, label, duration)
+        self.logger.debug(f'{label} {node.quantum.dataId} done in {duration:.1f}s')
+
+        for callback in self.quantumCallbacks:
+            try:
+                callback(label, node.quantum.dataId, refs, reduction.butler)
+            except Exception as e:
+                self.logger.exception(e)
+
+        # from quantum completion to its outputs being announced, eg callbacks.isr for the detrend keys.
+        self.metrics.add(visits, f'callbacks.{label}', time.time() - start)
+
+    def genDetrendKey(self, label, dataId, refs, butler):
+        """Generate detrend keyword as soon as the isr quantum of a camera has written its postISRCCD."""
+        if not self.doGenDetrendKey or label != 'isr':
+            return
+
+        for ref in refs:
+            if ref.datasetType.name != 'postISRCCD':
+                continue
+
+            try:
+                uri = butler.getURI(ref)
+            except FileNotFoundError:
+                continue  # optional outputs are not necessarily written.
+
+            self.bcast.inform(f'detrend={uri.ospath}')
+
+    def runReductionPipeline(self, where, reduction=None):
+        """
+        Execute the reduction pipeline for a given visit, synchronously, callers run it from the reduce queue.
+
+        Parameters
+        ----------
+        where : str
+            Query to filter the data for the specific visit.
+        reduction : ReductionRun, optional
+            Reduction run to build and execute the graph with, defaults to the current one.
+        """
+        quantumGraph = self.makeQuantumGraph(where=where, reduction=reduction)
+
+        if quantumGraph is None:
+            return
+
+        self.executeQuantumGraph(*quantumGraph, where=where)
 
     def addConfigOverride(self, configOverride):
-        """Apply config overrides to the pipeline, creating a new run if they differ from the last ones."""
-        needNewRun = self.configOverride is not None and self.configOverride != configOverride
-
-        if needNewRun:
-            self.logger.info('Config override changed; creating new reduction run.')
-            (self.reducePipeline, self.reduceButler,
-             self.executor, self.timestamp) = self.setupReducePipeline(self.datastore,
-                                                                       self.inputCollection,
-                                                                       self.outputCollection,
-                                                                       self.pipelineYaml,
-                                                                       self.taskThreads)
-        # just logging and setting override whenever it's actually necessary.
-        if self.configOverride != configOverride:
+        """
+        Apply config overrides to the pipeline, switching to another run if they differ from the last ones.
+
+        A recently used run configured with the same overrides is reused from the cache; otherwise a new run is
+        created, except for the very first override, which is applied to the initial run.
+
+        Parameters
+        ----------
+        configOverride : dict
+            Config overrides per task label.
+
+        Returns
+        -------
+        ReductionRun
+            Run configured with these overrides, callers build and execute their graph with it, as the current run
+            might be switched again concurrently.
+        """
+        with self.overrideLock:
+            return self._switchReduction(configOverride)
+
+    def _switchReduction(self, configOverride):
+        """Switch to the run configured with these overrides, must be called with the override lock held."""
+        if self.configOverride == configOverride:
+            return self.reduction
+
+        reduction = self.reductionCache.get(configOverride)
+
+        if reduction is not None:
+            self.logger.info(f'Config override changed; reusing reduction run {reduction.run}.')
+        else:
+            if self.configOverride is None:
+                reduction = self.reduction
+            else:
+                self.logger.info('Config override changed; creating new reduction run.')
+                reduction = self.setupReducePipeline(self.inputCollection, self.outputCollection, self.pipelineYaml,
+                                                     self.taskThreads)
+
             for label, cfg in configOverride.items():
                 for key, value in cfg.items():
                     # can't add config override for non-defined task.
-                    if label not in self.reducePipeline.task_labels:
+                    if label not in reduction.taskLabels:
                         continue
 
-                    self.reducePipeline.addConfigOverride(label, key=key, value=value)
+                    reduction.addConfigOverride(label, key=key, value=value)
                     self.logger.info(f'reducePipeline.addConfigOverride:{label} {key}={value}')
 
-            self.configOverride = configOverride
+            self.reductionCache.put(configOverride, reduction)
+
+        self.reduction = reduction
+        self.configOverride = configOverride
+
+        return reduction
 
     def startDotRoach(self, dataRoot, maskFile, cams, keepMoving=False):
         """Starting dotRoach loop."""
@@ -1,23 +1,138 @@
 import logging
 import time
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
-from lsst.ip.isr import AssembleCcdTask
 
-config = AssembleCcdTask.ConfigClass()
-config.doTrim = True
-assembleTask = AssembleCcdTask(config=config)
 
-from pfs.drp.stella.extractSpectraTask import ExtractSpectraTask
+@lru_cache(maxsize=None)
+def getAssembleTask():
+    """Return the AssembleCcdTask, constructed on first use and cached for the lifetime of the process."""
+    start = time.time()
+    from lsst.ip.isr import AssembleCcdTask
+
+    config = AssembleCcdTask.ConfigClass()
+    config.doTrim = True
+    assembleTask = AssembleCcdTask(config=config)
+
+    logging.info(f'AssembleCcdTask constructed in {round(time.time() - start, 2)}s')
+    return assembleTask
+
+
+@lru_cache(maxsize=None)
+def getExtractSpectraTask():
+    """Return the ExtractSpectraTask, constructed on first use and cached for the lifetime of the process."""
+    start = time.time()
+    from pfs.drp.stella.extractSpectraTask import ExtractSpectraTask
+
+    config = ExtractSpectraTask.ConfigClass()
+    config.doCrosstalk = False
+    config.validate()
+    extractSpectra = ExtractSpectraTask(config=config)
+
+    logging.info(f'ExtractSpectraTask constructed in {round(time.time() - start, 2)}s')
+    return extractSpectra
+
+
+def getAmpGeometry(detector):
+    """Return raw and horizontal overscan boxes of each amplifier, as (y0, y1, x0, x1) array bounds."""
+
+    def toBounds(bbox):
+        return bbox.getMinY(), bbox.getMaxY() + 1, bbox.getMinX(), bbox.getMaxX() + 1
+
+    return [(toBounds(amp.getRawBBox()), toBounds(amp.getRawHorizontalOverscanBBox())) for amp in detector]
+
+
+def subtractOverscan(image, ampGeometry, row0, row1):
+    """Subtract the median of each amplifier horizontal overscan from the window rows, in place.
+
+    All medians are computed in a single reduction over the stacked overscans. When the amplifiers span all the
+    window rows, they are then applied as a single per-column offset broadcast over the window.
+
+    Parameters
+    ----------
+    image : `numpy.ndarray`
+        Raw image, rows outside the window are not touched.
+    ampGeometry : `list`
+        (rawBox, overscanBox) per amplifier, as returned by `getAmpGeometry`.
+    row0, row1 : `int`
+        First and last rows of the window.
+    """
+    rawBoxes, overscanBoxes = zip(*ampGeometry)
+    # rows outside the window are NaN anyway.
+    overscans = [image[max(y0, row0):min(y1, row1 + 1), x0:x1] for y0, y1, x0, x1 in overscanBoxes]
+
+    if len(set([overscan.shape for overscan in overscans])) == 1:
+        medians = np.nanmedian(np.stack(overscans).reshape(len(overscans), -1), axis=1)
+    else:
+        medians = [np.nanmedian(overscan) for overscan in overscans]
+
+    colOffset = np.zeros(image.shape[1])
+    nAmps = np.zeros(image.shape[1], dtype='int')
+
+    for (y0, y1, x0, x1), median in zip(rawBoxes, medians):
+        colOffset[x0:x1] = median
+        nAmps[x0:x1] += 1
 
-config = ExtractSpectraTask.ConfigClass()
-config.doCrosstalk = False
-config.validate()
-extractSpectra = ExtractSpectraTask(config=config)
+    spanWindow = all([y0 <= row0 and y1 > row1 for y0, y1, x0, x1 in rawBoxes])
 
+    if spanWindow and nAmps.max() <= 1:
+        image[row0:row1 + 1] -= colOffset
+        return
 
-def getWindowedFluxes(exp, dataId, fiberTrace, detectorMap, darkVariance=30, **kwargs):
+    for (y0, y1, x0, x1), median in zip(rawBoxes, medians):
+        image[max(y0, row0):min(y1, row1 + 1), x0:x1] -= median
+
+
+def cropToReadoutWindow(exp, fiberTrace, maskVal):
+    """Crop assembled exposure and fiberTrace to the rows actually read out.
+
+    Parameters
+    ----------
+    exp : `lsst.afw.image.Exposure`
+        Assembled exposure, rows outside the window being flagged with ``maskVal``.
+    fiberTrace : `FiberTraceSet`
+        Full-frame fiber traces.
+    maskVal : `int`
+        Mask value flagging the rows outside the window.
+
+    Returns
+    -------
+    maskedImage : `lsst.afw.image.MaskedImage` or `None`
+        Window sub-image, in parent coordinates, `None` if no row has been read out.
+    fiberTrace : `FiberTraceSet` or `None`
+        Fiber traces cropped to the window, fibers outside of it being dropped.
+    """
+    import lsst.geom
+    from pfs.drp.stella import FiberTrace, FiberTraceSet
+
+    windowRows = np.flatnonzero(((exp.mask.array & maskVal) != maskVal).any(axis=1))
+
+    if not windowRows.size:
+        return None, None
+
+    bbox = exp.getBBox()
+    y0 = bbox.getMinY() + windowRows[0]
+    y1 = bbox.getMinY() + windowRows[-1]
+    window = lsst.geom.Box2I(lsst.geom.Point2I(bbox.getMinX(), y0), lsst.geom.Point2I(bbox.getMaxX(), y1))
+
+    cropped = FiberTraceSet(len(fiberTrace))
+
+    for trace in fiberTrace:
+        traceImage = trace.getTrace()
+        traceBox = traceImage.getBBox()
+        traceBox.clip(window)
+
+        if traceBox.isEmpty():
+            continue
+
+        cropped.add(FiberTrace(traceImage[traceBox].clone(), trace.getFiberId()))
+
+    return exp.maskedImage[window], cropped
+
+
+def getWindowedFluxes(exp, dataId, fiberTrace, detectorMap, darkVariance=30, cropToWindow=True, **kwargs):
     """Return an estimate of the median flux in each fibre
 
      Parameters
@@ -32,6 +147,9 @@ def getWindowedFluxes(exp, dataId, fiberTrace, detectorMap, darkVariance=30, **k
         Detector map object providing information about pixel-to-fiber mapping.
     darkVariance : `float`, optional
         Minimum variance value to be applied to prevent negative variance, by default 30.
+    cropToWindow : `bool`, optional
+        Extract only the rows within the read-out window, by default True. The detectorMap is not needed then, since
+        wavelengths are not used.
     **kwargs : `dict`
         Additional overrides to update `dataId`.
     """
@@ -45,16 +163,30 @@ def getWindowedFluxes(exp, dataId, fiberTrace, detectorMap, darkVariance=30, **k
     maskVal = exp.mask.getPlaneBitMask(["SAT", "NO_DATA"])
     exp.mask.array[0:row0] = maskVal
     exp.mask.array[row1 + 1:] = maskVal
-    exp.image.array[exp.mask.array != 0] = np.nan  # not 0; we're going to use np.nanmedian later
 
-    for amp in exp.getDetector():
-        exp[amp.getRawBBox()].image.array -= np.nanmedian(exp[amp.getRawHorizontalOverscanBBox()].image.array)
+    # not 0; we're going to use np.nanmedian later
+    image = exp.image.array
+    image[0:row0] = np.nan
+    image[row1 + 1:] = np.nan
+    window = image[row0:row1 + 1]
+    window[exp.mask.array[row0:row1 + 1] != 0] = np.nan
+
+    subtractOverscan(image, getAmpGeometry(exp.getDetector()), row0, row1)
 
-    exp = assembleTask.assembleCcd(exp)
+    exp = getAssembleTask().assembleCcd(exp)
     exp.variance = exp.image
     exp.variance.array += darkVariance  # need a floor to the noise to reduce the b arm
 
-    spectra = extractSpectra.run(exp.maskedImage, fiberTrace, detectorMap).spectra.toPfsArm(dataId)
+    maskedImage = exp.maskedImage
+
+    if cropToWindow:
+        # window rows are located from the mask, so the raw to assembled geometry does not matter.
+        windowImage, windowTrace = cropToReadoutWindow(exp, fiberTrace, maskVal)
+
+        if windowImage is not None:
+            maskedImage, fiberTrace, detectorMap = windowImage, windowTrace, None
+
+    spectra = getExtractSpectraTask().run(maskedImage, fiberTrace, detectorMap).spectra.toPfsArm(dataId)
     spectra.flux[spectra.mask != 0] = np.nan
 
     df = pd.DataFrame(dict(flux=np.nanmedian(spectra.flux, axis=1), fiberId=spectra.fiberId))
@@ -0,0 +1,117 @@
+import glob
+import logging
+import os
+import pickle
+import time
+
+
+class FiberTraceCache:
+    """
+    On-disk cache of fiberTraces built from fiberProfiles and detectorMap_calib.
+
+    Entries are keyed by the dataset IDs of the fiberProfiles and detectorMap_calib they were built from, so that
+    certifying new calibs automatically results in a cache miss; stale entries for that camera are then removed.
+    Entries are stored per drp_stella version, pickled fiberTraces not being expected to survive a stack upgrade.
+
+    Parameters
+    ----------
+    rootDir : str
+        Directory where the cached fiberTraces are stored, created if needed.
+    """
+
+    def __init__(self, rootDir):
+        self.rootDir = rootDir
+        self._versionDir = None
+
+    @property
+    def versionDir(self):
+        """Directory of the entries built with the current drp_stella version, resolved on first use."""
+        if self._versionDir is None:
+            self._versionDir = os.path.join(self.rootDir, self.stackVersion())
+
+        return self._versionDir
+
+    @staticmethod
+    def stackVersion():
+        """Version of drp_stella, which builds and defines the pickled fiberTraces."""
+        try:
+            from pfs.drp.stella.version import __version__
+        except ImportError:
+            try:
+                import pfs.drp.stella
+                __version__ = getattr(pfs.drp.stella, '__version__', 'unknown')
+            except ImportError:
+                __version__ = 'unknown'
+
+        return str(__version__).replace(os.sep, '_')
+
+    def filepath(self, cameraKey, fiberProfilesId, detectorMapId):
+        """Path of the cache entry for a camera and a pair of calibs."""
+        specNum, arm = cameraKey
+        return os.path.join(self.versionDir, f'{arm}{specNum}-{fiberProfilesId}-{detectorMapId}.pickle')
+
+    def get(self, butler, dataId):
+        """
+        Return the fiberTrace and detectorMap for a given exposure, building and caching the fiberTrace if needed.
+
+        Parameters
+        ----------
+        butler : lsst.daf.butler.Butler
+            Butler instance used to retrieve the calibs.
+        dataId : dict
+            Data ID of the exposure.
+
+        Returns
+        -------
+        tuple
+            (fiberTrace, detectorMap)
+        """
+        cameraKey = dataId['spectrograph'], dataId['arm']
+
+        # resolving dataset refs only, calibs are read only if needed.
+        fiberProfilesHandle = butler.getDeferred("fiberProfiles", dataId)
+        detectorMapHandle = butler.getDeferred("detectorMap_calib", dataId)
+
+        detectorMap = detectorMapHandle.get()
+        filepath = self.filepath(cameraKey, fiberProfilesHandle.ref.id, detectorMapHandle.ref.id)
+
+        if os.path.isfile(filepath):
+            start = time.time()
+            try:
+                with open(filepath, 'rb') as cacheFile:
+                    fiberTrace = pickle.load(cacheFile)
+            except Exception as e:
+                logging.warning(f'could not load cached fiberTrace for {cameraKey}, rebuilding it: {e}')
+            else:
+                logging.info(f'fiberTrace for {cameraKey} loaded from cache in {time.time() - start:.3f}s')
+                return fiberTrace, detectorMap
+
+        logging.info(f'making fiberTrace for {cameraKey}')
+        fiberProfiles = fiberProfilesHandle.get()
+        fiberTrace = fiberProfiles.makeFiberTracesFromDetectorMap(detectorMap)
+
+        try:
+            self.put(cameraKey, filepath, fiberTrace)
+        except Exception as e:
+            logging.warning(f'could not cache fiberTrace for {cameraKey}: {e}')
+
+        return fiberTrace, detectorMap
+
+    def put(self, cameraKey, filepath, fiberTrace):
+        """Write a cache entry atomically, removing stale entries for that camera and any partial write."""
+        specNum, arm = cameraKey
+        os.makedirs(self.versionDir, exist_ok=True)
+
+        for stale in glob.glob(os.path.join(self.versionDir, f'{arm}{specNum}-*.pickle')):
+            os.remove(stale)
+
+        tmpPath = f'{filepath}.tmp{os.getpid()}'
+        try:
+            with open(tmpPath, 'wb') as cacheFile:
+                pickle.dump(fiberTrace, cacheFile, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(tmpPath, filepath)
+        except Exception:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
@@ -1,8 +1,6 @@
-import glob
 import os
-import time
+import sys
 
-from drpActor.utils.threading import singleShot
 from ics.utils.sps.spectroIds import SpectroIds
 
 
@@ -27,6 +25,8 @@ class PfsConfigFile:
         Indicates whether the file has been ingested into the datastore.
     """
 
+    __slots__ = ('visit', 'filepath', 'ingested')
+
     fileNameFormat = "pfsConfig-0x%016x-%06d.fits"
     rootDir = '/data/raw'
 
@@ -46,20 +46,20 @@ class PfsConfigFile:
         filepath = os.path.join(cls.rootDir, dateDir, 'pfsConfig', cls.fileNameFormat % (pfsDesignId, visit))
         return cls(visit, filepath=filepath)
 
-    def initialize(self, butler):
+    def initialize(self, ingestIndex):
         """
         Set the state of the file based on its presence in the datastore.
 
         Parameters
         ----------
-        butler : lsst.daf.butler.Butler
-            Butler instance to query the datastore.
+        ingestIndex : drpActor.utils.ingestIndex.IngestionIndex
+            Ingestion-state index, resolving whole visits in a single registry query.
 
         Notes
         -----
         Sets `self.ingested` to True if the pfsConfig file is found in the datastore.
         """
-        self.ingested = len(list(butler.registry.queryDatasets("pfsConfig", **self.dataId))) == 1
+        self.ingested = ingestIndex.isPfsConfigIngested(self.visit)
 
 
 class PfsFile:
@@ -87,14 +87,21 @@ class PfsFile:
         The arm/channel identifier (e.g., 'b', 'r', 'm').
     ingested : bool
         Indicates whether the file has been ingested into the datastore.
+
+    Notes
+    -----
+    Instances are kept for every live exposure, so they use `__slots__`, and root/night strings are interned to be
+    shared between all the files of a night.
     """
 
+    __slots__ = ('root', 'night', 'filename', 'visit', 'specNum', 'armNum', 'arm', 'ingested')
+
     fromArmNum = dict([(v, k) for k, v in SpectroIds.validArms.items()])
 
     def __init__(self, root, night, filename):
         """Initialize the PfsFile object."""
-        self.root = root
-        self.night = night
+        self.root = sys.intern(root)
+        self.night = sys.intern(night)
         self.filename = filename
 
         # Extract metadata from filename
@@ -104,7 +111,6 @@ class PfsFile:
 
         self.arm = PfsFile.fromArmNum[self.armNum]
         self.ingested = False
-        self.postIsrFilepath = ''
 
     @property
     def filepath(self):
@@ -137,91 +143,20 @@ class PfsFile:
         """Extract the arm number from the filename."""
         return int(filename[11])
 
-    def initialize(self, butler):
+    def initialize(self, ingestIndex):
         """
         Set the ingestion state of the file based on its presence in the datastore.
 
         Parameters
         ----------
-        butler : lsst.daf.butler.Butler
-            Butler instance to query the datastore.
+        ingestIndex : drpActor.utils.ingestIndex.IngestionIndex
+            Ingestion-state index, resolving whole visits in a single registry query.
 
         Notes
         -----
         Sets `self.ingested` to True if the raw file is found in the datastore.
         """
-        self.ingested = len(list(butler.registry.queryDatasets("raw", **self.dataId))) == 1
-
-    def getPostIsrFilepath(self, engine):
-        """
-        Retrieve the file path of the post-ISR image.
-
-        Parameters
-        ----------
-        butler : lsst.daf.butler.Butler
-            Butler instance used to query the datastore.
-
-        Returns
-        -------
-        str
-            The local file path to the post-ISR image.
-        """
-
-        def toPostISRCCDFilename(dataId, outputCollection, run):
-            parts = ['postISRCCD', 'PFS', f'{dataId["visit"]:06d}', f'{dataId["arm"]}{dataId["spectrograph"]}',
-                     outputCollection.replace('/', '_'), run]
-            filename = f'{"_".join(parts)}.fits'
-            return filename
-
-        directory = os.path.join(engine.datastore, engine.outputCollection, engine.timestamp, 'postISRCCD',
-                                 self.night.replace('-', ''), f'{self.dataId["visit"]:06d}')
-        filename = toPostISRCCDFilename(self.dataId, engine.outputCollection, engine.timestamp)
-        fullPath = os.path.join(directory, filename)
-
-        return fullPath
-
-    @singleShot
-    def setupDetrendKeyCallback(self, engine):
-        """
-        Monitor the datastore for the presence of post-ISR images and trigger a callback.
-
-        Parameters
-        ----------
-        pfsVisit : int
-            The visit ID associated with the observation.
-        butler : lsst.daf.butler.Butler
-            Butler instance used to query the datastore.
-        callback : callable
-            The callback function to invoke when the post-ISR image is available.
-
-        Notes
-        -----
-        This function waits for the post-ISR image to become available within a time limit.
-        If the image is found, the callback is triggered with the image's file path.
-        If not found, a warning is logged.
-        """
-        # constructing the path only once.
-        self.postIsrFilepath = self.getPostIsrFilepath(engine)
-
-        def postIsrWasGenerated():
-            """Check if the post-ISR image is available in the datastore."""
-            if not self.postIsrFilepath:
-                return False
-            return len(glob.glob(self.postIsrFilepath)) != 0
-
-        start_time = time.time()
-        config = engine.detrendCallback
-
-        # Wait for the post-ISR image to become available or until timeout
-        while not postIsrWasGenerated():
-            if (time.time() - start_time) > config['timeout']:
-                break
-
-            time.sleep(config['waitInterval'])
-
-        # If post-ISR image found, trigger callback; otherwise, log a warning
-        if postIsrWasGenerated():
-            engine.actor.bcast.inform(f'detrend={self.postIsrFilepath}')
+        self.ingested = ingestIndex.isRawIngested(self.dataId)
 
 
 class CCDFile(PfsFile):
@@ -238,6 +173,8 @@ class CCDFile(PfsFile):
         Indicates whether the CCD data is windowed based on metadata.
     """
 
+    __slots__ = ()
+
     @property
     def filepath(self):
         """Return the full path to the CCD file within the 'sps' directory."""
@@ -266,6 +203,9 @@ class HxFile(PfsFile):
 
     Inherits from `PfsFile` and provides specific attributes for Hx data.
     """
+
+    __slots__ = ()
+
     @property
     def filepath(self):
         """Return the full path to the CCD file within the 'sps' directory."""
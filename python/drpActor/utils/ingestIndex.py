@@ -0,0 +1,193 @@
+import threading
+import time
+
+
+class IngestionIndex:
+    """
+    Per-visit cache of the ingestion state of raw and pfsConfig datasets.
+
+    Instead of querying the registry once per file, the index resolves the ingestion state of whole visits (or a
+    whole range of visits, e.g. a night) with a single batched query per dataset type, and is updated incrementally
+    from the refs returned by the ingest tasks.
+
+    Parameters
+    ----------
+    rawButler : lsst.daf.butler.Butler
+        Butler used to query raw datasets.
+    pfsConfigButler : lsst.daf.butler.Butler
+        Butler used to query pfsConfig datasets.
+    refreshPeriod : float, optional
+        Minimum time in seconds between two registry queries for a visit which still has missing datasets, so that
+        files ingested outside of the actor are eventually seen.
+
+    Attributes
+    ----------
+    raw : dict
+        visit -> set of (arm, spectrograph) already ingested.
+    pfsConfig : dict
+        visit -> True if the pfsConfig is already ingested.
+    """
+
+    def __init__(self, rawButler, pfsConfigButler, refreshPeriod=10):
+        self.rawButler = rawButler
+        self.pfsConfigButler = pfsConfigButler
+        self.refreshPeriod = refreshPeriod
+
+        self.raw = dict()
+        self.pfsConfig = dict()
+        self.lastQueried = dict()  # visit -> time.time() of the last registry query.
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def queryVisits(butler, datasetType, visits):
+        """
+        Query all datasets of a given type for a list of visits in one registry round trip.
+
+        Parameters
+        ----------
+        butler : lsst.daf.butler.Butler
+            Butler instance to query the datastore.
+        datasetType : str
+            Dataset type name, eg "raw" or "pfsConfig".
+        visits : list of int
+            Visits to resolve.
+
+        Returns
+        -------
+        list
+            Data IDs of the matching datasets.
+        """
+        if butler is None or not visits:
+            return []
+
+        refs = butler.registry.queryDatasets(datasetType, where='visit IN (visits)', bind=dict(visits=tuple(visits)))
+        return [ref.dataId for ref in refs]
+
+    def refresh(self, visits, doRaw=True, doPfsConfig=True):
+        """
+        Re-synchronize the ingestion state of a set of visits with the registry.
+
+        Parameters
+        ----------
+        visits : iterable of int
+            Visits to refresh, typically one visit or a full range of visits to be ingested.
+        doRaw : bool, optional
+            Refresh raw datasets.
+        doPfsConfig : bool, optional
+            Refresh pfsConfig datasets.
+        """
+        visits = sorted(set(map(int, visits)))
+        now = time.time()
+
+        raw = dict([(visit, set()) for visit in visits]) if doRaw else dict()
+        pfsConfig = dict([(visit, False) for visit in visits]) if doPfsConfig else dict()
+
+        if doRaw:
+            for dataId in self.queryVisits(self.rawButler, 'raw', visits):
+                raw[dataId['visit']].add((dataId['arm'], dataId['spectrograph']))
+
+        if doPfsConfig:
+            for dataId in self.queryVisits(self.pfsConfigButler, 'pfsConfig', visits):
+                pfsConfig[dataId['visit']] = True
+
+        with self.lock:
+            self.raw.update(raw)
+            self.pfsConfig.update(pfsConfig)
+
+            if doRaw and doPfsConfig:
+                self.lastQueried.update([(visit, now) for visit in visits])
+
+    def forget(self, visits):
+        """
+        Drop visits from the index, e.g. once evicted from the engine, they would be queried again if needed.
+
+        Parameters
+        ----------
+        visits : iterable of int
+            Visits to drop.
+        """
+        with self.lock:
+            for visit in visits:
+                self.raw.pop(visit, None)
+                self.pfsConfig.pop(visit, None)
+                self.lastQueried.pop(visit, None)
+
+    def addRawRefs(self, refs):
+        """
+        Record raw datasets which have just been ingested.
+
+        Parameters
+        ----------
+        refs : iterable of lsst.daf.butler.DatasetRef
+            Refs returned by the raw ingest task.
+        """
+        with self.lock:
+            for ref in refs:
+                dataId = ref.dataId
+                self.raw.setdefault(dataId['visit'], set()).add((dataId['arm'], dataId['spectrograph']))
+
+    def _ensureVisit(self, visit, isIngested):
+        """
+        Query the registry for that visit if it is not known yet, or if the dataset is still missing and the visit
+        was not queried in the last `refreshPeriod` seconds, then return the ingestion state.
+
+        Parameters
+        ----------
+        visit : int
+            Visit identifier.
+        isIngested : callable
+            Return the ingestion state of the dataset from the index, called with the lock held.
+
+        Returns
+        -------
+        bool
+            True if the dataset is ingested.
+        """
+        with self.lock:
+            isKnown = visit in self.raw and visit in self.pfsConfig
+
+            if isKnown and isIngested():
+                return True
+
+            isStale = time.time() - self.lastQueried.get(visit, 0) > self.refreshPeriod
+
+        if isKnown and not isStale:
+            return False
+
+        self.refresh([visit])
+
+        with self.lock:
+            return isIngested()
+
+    def isRawIngested(self, dataId):
+        """
+        Check whether a raw dataset is ingested.
+
+        Parameters
+        ----------
+        dataId : dict
+            Data ID with visit, arm and spectrograph keys.
+
+        Returns
+        -------
+        bool
+            True if the raw file is found in the datastore.
+        """
+        visit = dataId['visit']
+        return self._ensureVisit(visit, lambda: (dataId['arm'], dataId['spectrograph']) in self.raw.get(visit, ()))
+
+    def isPfsConfigIngested(self, visit):
+        """
+        Check whether the pfsConfig of a given visit is ingested.
+
+        Parameters
+        ----------
+        visit : int
+            Visit identifier.
+
+        Returns
+        -------
+        bool
+            True if the pfsConfig file is found in the datastore.
+        """
+        return self._ensureVisit(visit, lambda: self.pfsConfig.get(visit, False))
@@ -0,0 +1,165 @@
+import glob
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class IterationStore:
+    """
+    Append-only store of the DotRoach iterations.
+
+    The history is kept in memory, one dataframe per iteration, along with a dense (iteration x cobra) normalized
+    flux array used by the stopping rules, preallocated and grown by doubling. Each new iteration is written as its
+    own pickled segment and appended to the legacy allIterations csv, so the cost of an iteration no longer depends on
+    the number of previous ones.
+
+    Parameters
+    ----------
+    dataRoot : str
+        DotRoach output directory, segments are written in its `iterations` subdirectory.
+    legacyCsv : str, optional
+        allIterations csv, used to seed the store if there is no segment yet, then kept up to date.
+    """
+    segmentFormat = 'iter%04d.pickle'
+    initialCapacity = 16  # iterations
+
+    def __init__(self, dataRoot, legacyCsv=None):
+        self.segmentsRoot = os.path.join(dataRoot, 'iterations')
+        self.legacyCsv = legacyCsv
+        os.makedirs(self.segmentsRoot, exist_ok=True)
+
+        self.iterations = []
+        self.cobraIds = None
+        self.nRows = 0  # rows written to the csv so far.
+        self._flux = None  # preallocated (capacity x cobra) array, only the first len(iterations) rows are valid.
+
+        segments = sorted(glob.glob(os.path.join(self.segmentsRoot, '*.pickle')))
+
+        if segments:
+            logging.info(f'reloading {len(segments)} iteration(s) from {self.segmentsRoot}')
+            for segment in segments:
+                self._add(pd.read_pickle(segment))
+
+            # the csv might be behind the segments, if interrupted in between.
+            if legacyCsv:
+                self.exportCsv(legacyCsv)
+
+        elif legacyCsv and os.path.isfile(legacyCsv) and os.path.getsize(legacyCsv):
+            self.seed(pd.read_csv(legacyCsv, index_col=0))
+
+    @property
+    def empty(self):
+        """True if no iteration has been stored yet."""
+        return not self.iterations
+
+    @property
+    def last(self):
+        """Last iteration dataframe."""
+        return self.iterations[-1]
+
+    @property
+    def fluxHistory(self):
+        """Normalized flux history, shape (nIter, nCobra), a view on the preallocated array."""
+        return self._flux[:len(self.iterations)]
+
+    def _reserve(self, nIter):
+        """Make room for `nIter` iterations, doubling the capacity if needed."""
+        if nIter <= len(self._flux):
+            return
+
+        capacity = max(nIter, 2 * len(self._flux))
+        flux = np.full((capacity, self._flux.shape[1]), np.nan)
+        flux[:len(self.iterations)] = self.fluxHistory
+        self._flux = flux
+
+    def historyWith(self, fluxNorm):
+        """
+        Return the flux history followed by a candidate iteration, without storing it.
+
+        Parameters
+        ----------
+        fluxNorm : numpy.ndarray
+            Normalized flux of the candidate iteration, ordered as `cobraIds`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Shape (nIter + 1, nCobra), a view on the preallocated array.
+        """
+        nIter = len(self.iterations)
+        self._reserve(nIter + 1)
+        self._flux[nIter] = fluxNorm
+        return self._flux[:nIter + 1]
+
+    def seed(self, allIterations):
+        """Seed the store from an allIterations dataframe, writing one segment per iteration."""
+        if allIterations.empty:
+            return
+
+        for nIter, iterData in allIterations.groupby('nIter'):
+            self._writeSegment(iterData)
+            self._add(iterData)
+
+        # the csv already holds these rows.
+        self.nRows = len(allIterations)
+
+    def append(self, newIter):
+        """
+        Append a new iteration, in memory and on disk.
+
+        Parameters
+        ----------
+        newIter : pandas.DataFrame
+            Iteration data, one row per cobra, with `nIter` and `fluxNorm` columns.
+        """
+        self._writeSegment(newIter)
+        self._add(newIter)
+
+        if self.legacyCsv:
+            self._appendCsv(self.last)
+
+    def _writeSegment(self, newIter):
+        """Write an iteration segment atomically."""
+        [nIter] = newIter.nIter.unique()
+        filepath = os.path.join(self.segmentsRoot, IterationStore.segmentFormat % nIter)
+
+        tmpPath = f'{filepath}.tmp'
+        newIter.to_pickle(tmpPath)
+        os.replace(tmpPath, filepath)
+
+    def _appendCsv(self, newIter):
+        """Append an iteration to the allIterations csv, with the same index as a full export would have."""
+        rows = newIter.reset_index(drop=True)
+        rows.index += self.nRows
+        rows.to_csv(self.legacyCsv, mode='a', header=not self.nRows)
+        self.nRows += len(rows)
+
+    def _add(self, newIter):
+        """Add iteration to the in-memory history."""
+        newIter = newIter.sort_values('cobraId')
+        fluxNorm = newIter.fluxNorm.to_numpy(dtype='float64')
+
+        if self._flux is None:
+            self.cobraIds = newIter.cobraId.to_numpy()
+            self._flux = np.full((IterationStore.initialCapacity, len(fluxNorm)), np.nan)
+
+        self._reserve(len(self.iterations) + 1)
+        self._flux[len(self.iterations)] = fluxNorm
+        self.iterations.append(newIter)
+
+    def toDataFrame(self):
+        """Return the whole history as a single allIterations dataframe."""
+        if self.empty:
+            return pd.DataFrame([])
+
+        return pd.concat(self.iterations).reset_index(drop=True)
+
+    def exportCsv(self, filepath):
+        """Export the whole history to the legacy allIterations csv."""
+        allIterations = self.toDataFrame()
+        allIterations.to_csv(filepath)
+
+        if filepath == self.legacyCsv:
+            self.nRows = len(allIterations)
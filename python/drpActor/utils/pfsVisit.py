@@ -19,8 +19,8 @@ class PfsVisit:
         The visit ID for this observation.
     pfsConfigFile : PfsConfigFile
         The configuration file associated with the visit.
-    exposureFiles : list
-        A list of exposure files associated with the visit.
+    exposures : dict
+        Exposure files associated with the visit, keyed by (arm, spectrograph).
     wasProcessed : bool
         Indicates whether the visit has been processed.
     """
@@ -45,7 +45,19 @@ class PfsVisit:
             pfsConfigFile = PfsConfigFile(visit, filepath=None)
 
         self.pfsConfigFile = pfsConfigFile
-        self.exposureFiles = []  # Initialize the list of exposure files.
+        self.exposures = dict()  # (arm, spectrograph) -> exposure file.
+
+    @property
+    def exposureFiles(self):
+        """
+        Get the list of exposure files associated with the visit, one per camera.
+
+        Returns
+        -------
+        list
+            Exposure files, in arrival order.
+        """
+        return list(self.exposures.values())
 
     @property
     def allFiles(self):
@@ -59,6 +71,11 @@ class PfsVisit:
         """
         return self.exposureFiles + [self.pfsConfigFile]
 
+    @property
+    def night(self):
+        """Observing night of the visit, taken from its exposure files, None if there is none yet."""
+        return next(iter(self.exposures.values())).night if self.exposures else None
+
     @property
     def isIngested(self):
         """
@@ -71,36 +88,47 @@ class PfsVisit:
         """
         return all(file.ingested for file in self.allFiles)
 
-    def addExposure(self, exposureFile):
+    def hasExposure(self, exposureFile):
         """
-        Add an exposure file to the list of exposures for the visit.
+        Check whether that exact exposure file is already part of the visit, e.g. re-broadcast keyword.
 
         Parameters
         ----------
         exposureFile : PfsFile
-            The exposure file to add to the visit.
+            The exposure file to look for.
+
+        Returns
+        -------
+        bool
+            True if the visit already has a file with the same path for that camera.
         """
-        self.exposureFiles.append(exposureFile)
+        known = self.exposures.get((exposureFile.arm, exposureFile.specNum))
+        return known is not None and known.filepath == exposureFile.filepath
 
-    def setupDetrendCallback(self, engine):
+    def addExposure(self, exposureFile):
         """
-        Set up a callback to monitor the completion of post-ISR processing for exposures.
+        Add an exposure file to the visit, replacing any previous file for the same camera.
 
         Parameters
         ----------
-        butler : lsst.daf.butler.Butler
-            The Butler instance used to query the datastore.
-        callback : callable
-            A callback function to invoke when the post-ISR image is available.
-
-        Notes
-        -----
-        This method iterates over all exposure files associated with the visit and
-        sets up a callback for each one to notify when the post-ISR image becomes available.
+        exposureFile : PfsFile
+            The exposure file to add to the visit.
         """
-        for exposureFile in self.exposureFiles:
-            exposureFile.setupDetrendKeyCallback(engine)
+        self.exposures[exposureFile.arm, exposureFile.specNum] = exposureFile
 
     def finish(self):
         """Placeholder"""
         self.wasProcessed = True
+
+    def toRecord(self):
+        """
+        Compact, JSON serializable, record of the visit.
+
+        Returns
+        -------
+        dict
+            Visit, night, pfsConfig filepath, exposure filenames and ingestion/processing state.
+        """
+        return dict(visit=self.visit, night=self.night, pfsConfig=self.pfsConfigFile.filepath,
+                    files=[file.filename for file in self.exposureFiles], ingested=self.isIngested,
+                    processed=self.wasProcessed)
@@ -0,0 +1,282 @@
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# per-process state of the workers, populated by _initWorker.
+_worker = dict()
+
+
+def _initWorker(datastore, taskThreads, maxButlers):
+    """Import the stack and set up the task factory once per worker process."""
+    from lsst.ctrl.mpexec import SingleQuantumExecutor, TaskFactory
+    from lsst.daf.butler.cli.cliLog import CliLog
+    from lsst.pipe.base import ExecutionResources
+
+    CliLog.setLogLevels([('lsst', 'INFO'), ('pfs', 'INFO')])
+    CliLog.initLog(longlog=True)
+
+    _worker.update(datastore=datastore,
+                   butlers=OrderedDict(),
+                   maxButlers=maxButlers,
+                   taskFactory=TaskFactory(),
+                   resources=ExecutionResources(num_cores=taskThreads),
+                   SingleQuantumExecutor=SingleQuantumExecutor)
+
+
+def _ping():
+    """No-op job, used to make sure that every worker is up and warm."""
+    return True
+
+
+def _getButler(run):
+    """Return the worker butler for that run, a view over a repository opened only once per worker."""
+    from lsst.daf.butler import Butler
+
+    if 'root' not in _worker:
+        _worker['root'] = Butler(_worker['datastore'], writeable=True)
+
+    butlers = _worker['butlers']
+
+    if run in butlers:
+        butlers.move_to_end(run)
+    else:
+        butlers[run] = Butler(butler=_worker['root'], run=run)
+
+        # one butler per cached reduction run, runs evicted from the engine cache are never used again.
+        while len(butlers) > _worker['maxButlers']:
+            butlers.popitem(last=False)
+
+    return butlers[run]
+
+
+def _executeQuantum(taskNode, quantum, run):
+    """Execute a single quantum in a worker process, return the execution time."""
+    start = time.perf_counter()
+
+    executor = _worker['SingleQuantumExecutor'](butler=_getButler(run),
+                                                task_factory=_worker['taskFactory'],
+                                                clobber_outputs=True,
+                                                resources=_worker['resources'])
+    executor.execute(taskNode, quantum)
+
+    return time.perf_counter() - start
+
+
+class QuantumWorkerPool:
+    """
+    Long-lived pool of worker processes executing quanta, shared across visits and groups.
+
+    Each worker imports the LSST/PFS stack and opens the repository once, instead of paying the process
+    startup for every quantum as `run_pipeline` does. Workers are started with the "spawn" method, since the engine
+    itself is multi-threaded. If a worker dies, the pool is restarted and the quanta which were in flight are retried
+    once.
+
+    Parameters
+    ----------
+    engine : DrpEngine
+        The engine instance, providing the datastore and the logger.
+    numProc : int
+        Number of worker processes.
+    taskThreads : int, optional
+        Threads per quantum (ExecutionResources.num_cores).
+    maxButlers : int, optional
+        Butlers kept per worker, one per run, matching the number of reduction runs cached by the engine.
+    """
+
+    def __init__(self, engine, numProc, taskThreads=1, maxButlers=4):
+        self.engine = engine
+        self.numProc = max(1, numProc if numProc else 1)
+        self.taskThreads = taskThreads
+        self.maxButlers = max(1, maxButlers)
+
+        self.pool = None
+        self.pings = []  # futures of the warm-up jobs of the current pool.
+        self.lock = threading.Lock()
+
+    @property
+    def logger(self):
+        """Retrieve the logger instance from the engine."""
+        return self.engine.logger
+
+    def _createPool(self):
+        """Create the process pool and warm it up, non-blocking."""
+        context = multiprocessing.get_context('spawn')
+        pool = ProcessPoolExecutor(max_workers=self.numProc, mp_context=context, initializer=_initWorker,
+                                   initargs=(self.engine.datastore, self.taskThreads, self.maxButlers))
+        # make sure every worker is spawned and has imported the stack before the first quantum.
+        self.pings = [pool.submit(_ping) for i in range(self.numProc)]
+
+        self.logger.info(f'quantum worker pool started with {self.numProc} processes')
+        return pool
+
+    def start(self, waitReady=False):
+        """
+        Start the worker processes, if not already running.
+
+        Parameters
+        ----------
+        waitReady : bool, optional
+            Block until every worker has been spawned and has imported the stack.
+        """
+        with self.lock:
+            if self.pool is None:
+                self.pool = self._createPool()
+
+            pings = list(self.pings)
+
+        if waitReady:
+            wait(pings)
+
+    def shutdown(self):
+        """Terminate the worker processes."""
+        with self.lock:
+            pool, self.pool = self.pool, None
+
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def restart(self, brokenPool):
+        """Restart the pool after a worker died, unless a concurrent execution already did it."""
+        with self.lock:
+            if self.pool is not brokenPool:
+                return
+
+            self.logger.warning('quantum worker pool is broken, restarting...')
+            self.pool = self._createPool()
+
+        brokenPool.shutdown(wait=False, cancel_futures=True)
+
+    def execute(self, quantumGraph, run, failFast=False, callback=None):
+        """
+        Execute a quantum graph, submitting each quantum as soon as all its inputs have been produced.
+
+        Parameters
+        ----------
+        quantumGraph : lsst.pipe.base.QuantumGraph
+            Quantum graph to execute.
+        run : str
+            Output run collection.
+        failFast : bool, optional
+            Stop submitting new quanta after the first failure.
+        callback : callable, optional
+            Called as callback(node, duration) each time a quantum completes successfully, from the calling thread.
+
+        Raises
+        ------
+        RuntimeError
+            Raised if any quantum failed.
+        """
+        self.start()
+
+        nodes = dict([(node.nodeId, node) for node in quantumGraph])
+        waitingOn = dict()
+        dependents = defaultdict(list)
+
+        for nodeId, node in nodes.items():
+            waitingOn[nodeId] = set(input.nodeId for input in quantumGraph.determineInputsToQuantumNode(node))
+            for inputId in waitingOn[nodeId]:
+                dependents[inputId].append(nodeId)
+
+        ready = [nodeId for nodeId, inputs in waitingOn.items() if not inputs]
+        running = dict()
+        retried = set()
+        succeeded = set()
+        failed = set()
+        skipped = set()
+
+        def skipDependents(nodeId):
+            """Skip all quanta downstream of a failed one."""
+            for dependentId in dependents[nodeId]:
+                if dependentId not in skipped:
+                    skipped.add(dependentId)
+                    skipDependents(dependentId)
+
+        def onFailure(nodeId, exc):
+            """Bookkeeping of a failed quantum."""
+            node = nodes[nodeId]
+            self.logger.error(f'{node.task_node.label} failed for {node.quantum.dataId}: {exc}')
+            failed.add(nodeId)
+            skipDependents(nodeId)
+
+        def retryOrFail(nodeId, exc):
+            """Retry a quantum once if its worker died or if it could not be submitted, fail it otherwise."""
+            if nodeId in retried:
+                onFailure(nodeId, exc)
+            else:
+                retried.add(nodeId)
+                ready.append(nodeId)
+
+        def onSuccess(nodeId, duration):
+            """Notify the completion and release quanta waiting on that one."""
+            succeeded.add(nodeId)
+
+            if callback is not None:
+                try:
+                    callback(nodes[nodeId], duration)
+                except Exception as e:
+                    self.logger.exception(e)
+
+            for dependentId in dependents[nodeId]:
+                waitingOn[dependentId].discard(nodeId)
+                if not waitingOn[dependentId] and dependentId not in skipped:
+                    ready.append(dependentId)
+
+        while ready or running:
+            aborted = failFast and failed
+            poolBroken = False
+
+            with self.lock:
+                pool = self.pool
+
+            if not aborted:
+                toSubmit = list(ready)
+                ready.clear()
+
+                for nodeId in toSubmit:
+                    if pool is None:
+                        onFailure(nodeId, RuntimeError('quantum worker pool is shut down'))
+                        continue
+
+                    node = nodes[nodeId]
+                    try:
+                        future = pool.submit(_executeQuantum, node.task_node, node.quantum, run)
+                    except (BrokenProcessPool, RuntimeError) as e:
+                        # the pool died, or was shut down, before the quantum could even be submitted.
+                        poolBroken = True
+                        retryOrFail(nodeId, e)
+                    else:
+                        running[future] = nodeId
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    nodeId = running.pop(future)
+                    try:
+                        duration = future.result()
+                    except (BrokenProcessPool, CancelledError) as e:
+                        # the pool died or was restarted by a concurrent execution.
+                        poolBroken = poolBroken or isinstance(e, BrokenProcessPool)
+                        retryOrFail(nodeId, e)
+                    except Exception as e:
+                        onFailure(nodeId, e)
+                    else:
+                        onSuccess(nodeId, duration)
+            elif not poolBroken:
+                break
+
+            if poolBroken:
+                # every other quantum in flight died with the pool, retry them as well.
+                for future, nodeId in list(running.items()):
+                    running.pop(future)
+                    retryOrFail(nodeId, BrokenProcessPool('worker died'))
+
+                if pool is not None:
+                    self.restart(pool)
+
+        if failed:
+            nSkipped = len(nodes) - len(succeeded) - len(failed)
+            raise RuntimeError(f'{len(failed)} quanta failed, {nSkipped} skipped out of {len(nodes)}')
@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+import threading
+
+from drpActor.utils.files import PfsFile
+
+
+class RawDataIndex:
+    """
+    Persistent index of the raw data files, visit -> (night, pfsConfig path, exposure paths).
+
+    The raw root directory is scanned once, then only the nights whose `pfsConfig`, `sps` or `ramps` directories
+    have been modified since the last scan are scanned again. The index is also updated live from the file
+    keywords, and saved as JSON so that a restarted actor does not need to scan everything again.
+
+    Parameters
+    ----------
+    rootDir : str
+        Raw data root directory, containing one directory per night.
+    path : str, optional
+        JSON file the index is persisted to, the index is only kept in memory if not provided.
+    saveDelay : float, optional
+        Live updates are persisted at most `saveDelay` seconds after they are recorded, batched together.
+    """
+    subDirs = ('pfsConfig', 'sps', 'ramps')
+
+    def __init__(self, rootDir, path=None, saveDelay=10):
+        self.rootDir = rootDir
+        self.path = path
+        self.saveDelay = saveDelay
+
+        self.visits = dict()  # visit -> dict(night=, pfsConfig=, exposures=[filepath])
+        self.nights = dict()  # night -> modification times of its sub directories at last scan.
+        self.saveTimer = None  # pending save of the live updates.
+        # reentrant, refresh holds it while scanning, which records files through addPfsConfig/addExposure.
+        self.lock = threading.RLock()
+
+        self.load()
+
+    @property
+    def logger(self):
+        return logging.getLogger('rawIndex')
+
+    def load(self):
+        """Load the persisted index, if any, starting from an empty index if it cannot be read."""
+        if not self.path or not os.path.isfile(self.path):
+            return
+
+        try:
+            with open(self.path) as indexFile:
+                persisted = json.load(indexFile)
+
+            visits = dict([(int(visit), entry) for visit, entry in persisted['visits'].items()])
+            nights = dict(persisted['nights'])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            self.logger.warning(f'could not load raw index from {self.path}, starting from scratch: {e}')
+            self.visits, self.nights = dict(), dict()
+            return
+
+        self.visits = visits
+        self.nights = nights
+
+    def save(self):
+        """Persist the index, atomically."""
+        if not self.path:
+            return
+
+        with self.lock:
+            self.saveTimer = None
+            persisted = dict(nights=self.nights, visits=self.visits)
+            tmpPath = f'{self.path}.tmp'
+
+            try:
+                with open(tmpPath, 'w') as indexFile:
+                    json.dump(persisted, indexFile)
+                os.replace(tmpPath, self.path)
+            except OSError as e:
+                self.logger.warning(f'could not save raw index to {self.path}: {e}')
+
+    def saveSoon(self):
+        """Persist the index once `saveDelay` has elapsed, unless a save is already pending."""
+        if not self.path:
+            return
+
+        with self.lock:
+            if self.saveTimer is not None:
+                return
+
+            self.saveTimer = threading.Timer(self.saveDelay, self.save)
+            self.saveTimer.daemon = True
+            self.saveTimer.start()
+
+    def _entry(self, visit):
+        """Return the entry of a visit, created if needed, must be called with the lock held."""
+        if visit not in self.visits:
+            self.visits[visit] = dict(night=None, pfsConfig=None, exposures=[])
+
+        return self.visits[visit]
+
+    def addPfsConfig(self, visit, filepath, doSave=True):
+        """Record a pfsConfig file, persisted shortly after unless `doSave` is False."""
+        night = os.path.basename(os.path.dirname(os.path.dirname(filepath)))
+
+        with self.lock:
+            entry = self._entry(visit)
+            isNew = entry['pfsConfig'] != filepath
+            entry['night'] = night
+            entry['pfsConfig'] = filepath
+
+        if isNew and doSave:
+            self.saveSoon()
+
+    def addExposure(self, visit, filepath, doSave=True):
+        """Record a raw exposure file, persisted shortly after unless `doSave` is False."""
+        with self.lock:
+            entry = self._entry(visit)
+            isNew = filepath not in entry['exposures']
+
+            if isNew:
+                entry['exposures'].append(filepath)
+
+        if isNew and doSave:
+            self.saveSoon()
+
+    def nightSignature(self, nightDir):
+        """Modification times of the night sub directories, None for the missing ones."""
+        signature = []
+
+        for subDir in RawDataIndex.subDirs:
+            try:
+                signature.append(os.stat(os.path.join(nightDir, subDir)).st_mtime)
+            except FileNotFoundError:
+                signature.append(None)
+
+        return signature
+
+    def scanNight(self, night):
+        """List the pfsConfig and raw files of a night."""
+        nightDir = os.path.join(self.rootDir, night)
+
+        for subDir in RawDataIndex.subDirs:
+            try:
+                entries = os.scandir(os.path.join(nightDir, subDir))
+            except FileNotFoundError:
+                continue
+
+            with entries:
+                for dirEntry in entries:
+                    filename = dirEntry.name
+
+                    if not filename.endswith('.fits'):
+                        continue
+
+                    try:
+                        if subDir == 'pfsConfig':
+                            self.addPfsConfig(int(filename[-11:-5]), dirEntry.path, doSave=False)
+                        else:
+                            self.addExposure(PfsFile.toVisit(filename), dirEntry.path, doSave=False)
+                    except ValueError:
+                        continue
+
+    def refresh(self):
+        """Scan the nights which changed since the last scan, and persist the index if anything changed."""
+        try:
+            nights = sorted([dirEntry.name for dirEntry in os.scandir(self.rootDir) if dirEntry.is_dir()])
+        except FileNotFoundError:
+            self.logger.warning(f'{self.rootDir} does not exist')
+            return
+
+        nScanned = 0
+
+        with self.lock:
+            for night in nights:
+                signature = self.nightSignature(os.path.join(self.rootDir, night))
+
+                if self.nights.get(night) == signature:
+                    continue
+
+                self.scanNight(night)
+                self.nights[night] = signature
+                nScanned += 1
+
+            if nScanned:
+                self.logger.info(f'{nScanned} night(s) scanned in {self.rootDir}')
+                self.save()
+
+    def get(self, visit):
+        """
+        Look up the files of a visit.
+
+        Parameters
+        ----------
+        visit : int
+            Visit identifier.
+
+        Returns
+        -------
+        tuple
+            (pfsConfig path or None, list of exposure paths).
+        """
+        with self.lock:
+            entry = self.visits.get(visit)
+
+            if entry is None:
+                return None, []
+
+            return entry['pfsConfig'], list(entry['exposures'])
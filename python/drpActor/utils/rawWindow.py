@@ -0,0 +1,50 @@
+import numpy as np
+from astropy.io import fits
+from drpActor.utils.roachPool import windowKeys
+
+
+def readWindow(filepath, shape):
+    """
+    Read only the read-out row window of a raw CCD file, without going through the butler.
+
+    The file is memory-mapped and only the window rows (full width, overscan columns included) are read and
+    converted to float, the rest of the frame is never allocated.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the raw FITS file.
+    shape : tuple
+        Shape of the full raw image, as returned by the butler.
+
+    Returns
+    -------
+    window : numpy.ndarray
+        Float image of the window rows, starting at row `metadata['W_CDROW0']` of the full frame.
+    metadata : dict
+        Window header keywords.
+    """
+    with fits.open(filepath, memmap=True) as hdul:
+        hdu = next(hdu for hdu in hdul if hdu.header.get('NAXIS', 0) == 2)
+        metadata = dict([(key, hdu.header[key] if key in hdu.header else hdul[0].header[key]) for key in windowKeys])
+
+        nRows, nCols = hdu.header['NAXIS2'], hdu.header['NAXIS1']
+
+        if nCols != shape[1] or nRows > shape[0]:
+            raise ValueError(f'{filepath} shape {(nRows, nCols)} does not match raw shape {shape}')
+
+        row0, row1 = metadata['W_CDROW0'], metadata['W_CDROWN']
+
+        if nRows == shape[0]:
+            # full frame stored, only reading the window rows.
+            window = hdu.section[row0:row1 + 1, :]
+        else:
+            # only the window rows are stored.
+            window = hdu.section[:, :]
+
+        if row0 + len(window) > shape[0]:
+            raise ValueError(f'{filepath} window rows {row0}:{row0 + len(window)} exceed raw shape {shape}')
+
+        window = np.asarray(window, dtype='float32')
+
+    return window, metadata
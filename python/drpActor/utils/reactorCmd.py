@@ -0,0 +1,45 @@
+from twisted.internet import reactor
+from twisted.python import threadable
+
+
+class ReactorCmd:
+    """
+    Command proxy handing the replies over to the twisted reactor.
+
+    Replies generated from the engine worker threads are marshalled through `reactor.callFromThread`, replies
+    generated from the reactor thread itself are sent right away. Any other attribute is looked up on the wrapped
+    command.
+
+    Parameters
+    ----------
+    cmd : Command
+        Command to reply to, eg the actor bcast.
+    """
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+
+    def __getattr__(self, attr):
+        return getattr(self.cmd, attr)
+
+    def _reply(self, method, *args, **kwargs):
+        """Call a reply method of the wrapped command from the reactor thread."""
+        if threadable.isInIOThread():
+            method(*args, **kwargs)
+        else:
+            reactor.callFromThread(method, *args, **kwargs)
+
+    def inform(self, *args, **kwargs):
+        self._reply(self.cmd.inform, *args, **kwargs)
+
+    def diag(self, *args, **kwargs):
+        self._reply(self.cmd.diag, *args, **kwargs)
+
+    def warn(self, *args, **kwargs):
+        self._reply(self.cmd.warn, *args, **kwargs)
+
+    def fail(self, *args, **kwargs):
+        self._reply(self.cmd.fail, *args, **kwargs)
+
+    def finish(self, *args, **kwargs):
+        self._reply(self.cmd.finish, *args, **kwargs)
@@ -0,0 +1,179 @@
+import datetime
+import getpass
+import json
+import threading
+from collections import OrderedDict
+
+from lsst.pipe.base.all_dimensions_quantum_graph_builder import AllDimensionsQuantumGraphBuilder
+
+
+class ReductionRun:
+    """
+    Reduction pipeline bound to its output run and executor.
+
+    The pipeline graph (task imports, configs, dataset types) is resolved against the registry once and reused for
+    every quantum graph built in that run; it is only rebuilt after a config override. Init-outputs (task configs,
+    schemas, package versions) are written once per run, so that per-visit quantum graph generation only costs the
+    data ID query.
+
+    Parameters
+    ----------
+    pipeline : lsst.pipe.base.Pipeline
+        Reduction pipeline.
+    butler : lsst.daf.butler.Butler
+        Butler with the input collections and the output run.
+    executor : lsst.pipe.base.separable_pipeline_executor.SeparablePipelineExecutor
+        Executor bound to `butler`.
+    timestamp : str
+        Timestamp of the output run.
+    """
+
+    def __init__(self, pipeline, butler, executor, timestamp):
+        self.pipeline = pipeline
+        self.butler = butler
+        self.executor = executor
+        self.timestamp = timestamp
+
+        self._pipelineGraph = None
+        self.initOutputLabels = set()  # task labels for which init-outputs were written.
+
+        self.lock = threading.Lock()
+        self.initOutputLock = threading.Lock()
+
+    @property
+    def run(self):
+        """Output run collection."""
+        return self.butler.run
+
+    @property
+    def taskLabels(self):
+        """Labels of all the tasks in the pipeline."""
+        return self.pipeline.task_labels
+
+    @property
+    def pipelineGraph(self):
+        """Pipeline graph resolved against the registry, built on first use."""
+        with self.lock:
+            if self._pipelineGraph is None:
+                pipelineGraph = self.pipeline.to_graph()
+                pipelineGraph.resolve(registry=self.butler.registry)
+                self._pipelineGraph = pipelineGraph
+
+            return self._pipelineGraph
+
+    def addConfigOverride(self, label, key, value):
+        """Add a config override to the pipeline, invalidating the cached pipeline graph and init-outputs."""
+        self.pipeline.addConfigOverride(label, key=key, value=value)
+
+        with self.lock:
+            self._pipelineGraph = None
+
+        with self.initOutputLock:
+            self.initOutputLabels.clear()
+
+    def makeQuantumGraph(self, where):
+        """
+        Build a quantum graph from the cached pipeline graph.
+
+        Parameters
+        ----------
+        where : str
+            Query to filter the data to reduce.
+
+        Returns
+        -------
+        lsst.pipe.base.QuantumGraph
+            The quantum graph, empty if no data matched the query.
+        """
+        metadata = {
+            "input": list(self.butler.registry.defaults.collections),
+            "output_run": self.run,
+            "skip_existing_in": [],
+            "skip_existing": False,
+            "data_query": where,
+            "user": getpass.getuser(),
+            "time": str(datetime.datetime.now()),
+        }
+        builder = AllDimensionsQuantumGraphBuilder(self.pipelineGraph, self.butler, where=where, clobber=True)
+        return builder.build(metadata)
+
+    def preExecute(self, quantumGraph):
+        """
+        Write init-outputs and package versions, only for the tasks that have not been seen yet in this run.
+
+        Parameters
+        ----------
+        quantumGraph : lsst.pipe.base.QuantumGraph
+            Quantum graph about to be executed.
+        """
+        labels = set(node.task_node.label for node in quantumGraph)
+
+        with self.initOutputLock:
+            if labels.issubset(self.initOutputLabels):
+                return
+
+            self.executor.pre_execute_qgraph(quantumGraph, save_init_outputs=True, save_versions=True)
+            self.initOutputLabels |= labels
+
+    def execute(self, quantumGraph, workerPool, failFast, callback=None):
+        """
+        Execute a quantum graph built from this run, `preExecute` having been called beforehand.
+
+        Parameters
+        ----------
+        quantumGraph : lsst.pipe.base.QuantumGraph
+            Quantum graph to execute.
+        workerPool : drpActor.utils.quantumPool.QuantumWorkerPool
+            Persistent pool of worker processes executing the quanta.
+        failFast : bool
+            Abort execution on the first failing quantum.
+        callback : callable, optional
+            Called as callback(node, duration) each time a quantum completes successfully.
+        """
+        workerPool.execute(quantumGraph, run=self.run, failFast=failFast, callback=callback)
+
+
+class ReductionRunCache:
+    """
+    Bounded LRU cache of configured reduction runs, keyed by their config override.
+
+    Nights alternate between sequence types with different config overrides; switching back to a recently used
+    override reuses its pipeline, executor and output run instead of building a new one.
+
+    Parameters
+    ----------
+    maxSize : int, optional
+        Maximum number of reduction runs to keep.
+    """
+
+    def __init__(self, maxSize=4):
+        self.maxSize = maxSize
+        self.runs = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def toKey(configOverride):
+        """Canonical form of a config override dictionary, independent of key ordering."""
+        return json.dumps(configOverride, sort_keys=True, default=str)
+
+    def get(self, configOverride):
+        """Return the reduction run configured with that override, None if not cached."""
+        key = self.toKey(configOverride)
+
+        with self.lock:
+            if key not in self.runs:
+                return None
+
+            self.runs.move_to_end(key)
+            return self.runs[key]
+
+    def put(self, configOverride, reduction):
+        """Cache a reduction run, evicting the least recently used ones beyond `maxSize`."""
+        key = self.toKey(configOverride)
+
+        with self.lock:
+            self.runs[key] = reduction
+            self.runs.move_to_end(key)
+
+            while len(self.runs) > self.maxSize:
+                self.runs.popitem(last=False)
@@ -0,0 +1,206 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# header keywords describing the read-out row window, the only metadata used for flux extraction.
+windowKeys = ('W_CDROW0', 'W_CDROWN')
+
+# per-process state of a camera worker, populated by _loadCamera.
+_camera = dict()
+
+
+def _loadCamera(template, fiberTrace, detectorMap):
+    """Keep the camera template exposure, fiberTrace and detectorMap resident in the worker."""
+    import drpActor.utils.extractFlux as extractFlux
+
+    _camera.update(template=template, fiberTrace=fiberTrace, detectorMap=detectorMap)
+    # constructing the tasks now rather than on the first extraction.
+    extractFlux.getAssembleTask()
+    extractFlux.getExtractSpectraTask()
+
+
+def _extractFluxes(shmName, shape, dtype, row0, metadata, dataId):
+    """
+    Extract fluxes from an image in shared memory, return (fiberId, flux) arrays.
+
+    The image is either the full frame, or only some rows of it starting at `row0`, the other rows being zeroed.
+    """
+    import drpActor.utils.extractFlux as extractFlux
+
+    shm = shared_memory.SharedMemory(name=shmName)
+    # segment is owned and unlinked by the main process, do not let this process tracker claim it.
+    resource_tracker.unregister(shm._name, 'shared_memory')
+
+    try:
+        exp = _camera['template'].clone()
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+        if image.shape != exp.image.array.shape:
+            exp.image.array[:] = 0
+
+        exp.image.array[row0:row0 + shape[0]] = image
+    finally:
+        shm.close()
+
+    exp.mask.array[:] = 0
+    exp.variance.array[:] = 0
+
+    md = exp.getMetadata()
+    for key, value in metadata.items():
+        md.set(key, value)
+
+    df = extractFlux.getWindowedFluxes(exp, dataId, fiberTrace=_camera['fiberTrace'],
+                                       detectorMap=_camera['detectorMap'])
+    return df.fiberId.to_numpy(), df.flux.to_numpy()
+
+
+class CameraWorker:
+    """
+    Long-lived process dedicated to one camera.
+
+    The template exposure (geometry, detector), fiberTrace and detectorMap are sent once and stay resident in the
+    worker; on each iteration only the image pixels, possibly only the window rows, are copied to a shared memory
+    segment, and fluxes come back as plain arrays. If the worker process dies, it is restarted, the camera reloaded and
+    the pending extraction resubmitted once.
+
+    Parameters
+    ----------
+    context : multiprocessing.context.BaseContext
+        Multiprocessing context used to start the worker.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        self.shm = None
+        # camera template and calibs, kept to reload a restarted worker.
+        self.camera = None
+        self.loading = None
+        # arguments of the last extraction, to resubmit it to a restarted worker.
+        self.pending = None
+
+    @property
+    def loaded(self):
+        return self.camera is not None
+
+    def load(self, template, fiberTrace, detectorMap):
+        """Send the camera template exposure and calibs to the worker, non-blocking, checked in `result`."""
+        self.camera = template, fiberTrace, detectorMap
+        self.loading = self.executor.submit(_loadCamera, *self.camera)
+
+    def restart(self):
+        """Replace a dead worker process by a new one, reloading the camera if it was loaded."""
+        logging.warning('camera worker process died, restarting...')
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=self.context)
+
+        if self.loaded:
+            self.loading = self.executor.submit(_loadCamera, *self.camera)
+
+    def submit(self, image, metadata, dataId, row0=0):
+        """
+        Copy image pixels to shared memory and submit the flux extraction.
+
+        Parameters
+        ----------
+        image : numpy.ndarray
+            Raw image pixels, the full frame or only some of its rows.
+        metadata : dict
+            Header keywords to set on the template exposure.
+        dataId : dict
+            Data ID of the exposure.
+        row0 : int, optional
+            Row of the full frame where `image` starts.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future resolving to (fiberId, flux) arrays.
+        """
+        if self.shm is None or self.shm.size < image.nbytes:
+            self.releaseSharedMemory()
+            self.shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+
+        np.ndarray(image.shape, dtype=image.dtype, buffer=self.shm.buf)[:] = image
+        self.pending = image.shape, image.dtype.str, row0, metadata, dataId
+
+        try:
+            return self.executor.submit(_extractFluxes, self.shm.name, *self.pending)
+        except BrokenProcessPool:
+            self.restart()
+            return self.executor.submit(_extractFluxes, self.shm.name, *self.pending)
+
+    def result(self, future):
+        """
+        Wait for the camera load and the flux extraction, restarting the worker and resubmitting the extraction once
+        if the worker process died.
+
+        Parameters
+        ----------
+        future : concurrent.futures.Future
+            Future returned by `submit`, the last one for that worker.
+
+        Returns
+        -------
+        tuple
+            (fiberId, flux) arrays.
+        """
+        try:
+            self.checkLoaded()
+            return future.result()
+        except BrokenProcessPool:
+            self.restart()
+            future = self.executor.submit(_extractFluxes, self.shm.name, *self.pending)
+            self.checkLoaded()
+            return future.result()
+
+    def checkLoaded(self):
+        """Raise if the camera failed to load, forgetting it so that the next iteration loads it again."""
+        try:
+            self.loading.result()
+        except BrokenProcessPool:
+            raise
+        except Exception:
+            self.camera = None
+            raise
+
+    def releaseSharedMemory(self):
+        """Release the shared memory segment."""
+        if self.shm is None:
+            return
+
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def close(self):
+        """Terminate the worker and release the shared memory."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.releaseSharedMemory()
+
+
+class RoachPool:
+    """Pool of `CameraWorker`, one per camera, created on first use and kept for the whole roaching session."""
+
+    def __init__(self):
+        # engine is multi-threaded, spawn is the safe option.
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = dict()
+
+    def get(self, cameraKey):
+        """Return the worker for that camera, starting it if needed."""
+        if cameraKey not in self.workers:
+            self.workers[cameraKey] = CameraWorker(self.context)
+
+        return self.workers[cameraKey]
+
+    def close(self):
+        """Terminate all workers."""
+        for worker in self.workers.values():
+            worker.close()
+
+        self.workers.clear()
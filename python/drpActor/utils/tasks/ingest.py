@@ -2,10 +2,6 @@ import logging
 import os
 import time
 
-from lsst.obs.base.ingest import RawIngestConfig
-from lsst.obs.pfs.gen3 import PfsRawIngestTask
-from pfs.drp.stella.gen3 import ingestPfsConfig
-
 
 class IngestHandler(object):
     """
@@ -26,6 +22,10 @@ class IngestHandler(object):
         if not self.engine.rawButler:
             return None
 
+        # stack imported only once needed, so that the handler can be used with stand-in ingest tasks.
+        from lsst.obs.base.ingest import RawIngestConfig
+        from lsst.obs.pfs.gen3 import PfsRawIngestTask
+
         config = RawIngestConfig()
         config.transfer = self.engine.ingestMode
         return PfsRawIngestTask(config=config, butler=self.engine.rawButler)
@@ -40,21 +40,55 @@ class IngestHandler(object):
             self.engine.logger.warning(f'no filepath for pfsConfig with visit={pfsVisit.visit}')
             return
 
+        self.ingestPfsConfigFiles([pfsVisit])
+
+    def ingestPfsConfigFiles(self, pfsVisits):
+        """
+        Ingest the pfsConfig files of several visits in a single call, refreshing the index once, falling back to one
+        call per file if it fails, so that one bad file does not fail the others.
+
+        Parameters
+        ----------
+        pfsVisits : list of PfsVisit
+            Visits whose pfsConfig file to ingest, their ingestion state is updated.
+        """
+        from pfs.drp.stella.gen3 import ingestPfsConfig
+
         logger = logging.getLogger("pfs.ingestPfsConfig")
 
         # Clear existing handlers to prevent duplicate log messages
         if logger.hasHandlers():
             logger.handlers.clear()
 
-        pathList = [pfsVisit.pfsConfigFile.filepath]
-
-        try:
+        def ingest(pathList):
             ingestPfsConfig(self.engine.datastore, 'PFS', self.engine.pfsConfigRun, pathList,
                             transfer=self.engine.ingestMode, update=True)
+
+        try:
+            ingest([pfsVisit.pfsConfigFile.filepath for pfsVisit in pfsVisits])
         except Exception as e:
             logger.exception(e)
 
-        pfsVisit.pfsConfigFile.initialize(self.engine.pfsConfigButler)
+            if len(pfsVisits) > 1:
+                self.engine.logger.warning(f'pfsConfig ingest of {len(pfsVisits)} file(s) failed, retrying per file.')
+                # some files might have been registered before the failure, re-synchronizing with the registry.
+                self.engine.ingestIndex.refresh([pfsVisit.visit for pfsVisit in pfsVisits], doRaw=False)
+
+                for pfsVisit in pfsVisits:
+                    pfsVisit.pfsConfigFile.initialize(self.engine.ingestIndex)
+
+                    if pfsVisit.pfsConfigFile.ingested:
+                        continue
+
+                    try:
+                        ingest([pfsVisit.pfsConfigFile.filepath])
+                    except Exception as e:
+                        logger.exception(f'pfsConfig ingest of {pfsVisit.pfsConfigFile.filepath} failed: {e}')
+
+        self.engine.ingestIndex.refresh([pfsVisit.visit for pfsVisit in pfsVisits], doRaw=False)
+
+        for pfsVisit in pfsVisits:
+            pfsVisit.pfsConfigFile.initialize(self.engine.ingestIndex)
 
     def ingestExposureFiles(self, pfsVisit):
         """Ingest all exposure files for the given visit."""
@@ -64,25 +98,62 @@ class IngestHandler(object):
             self.engine.logger.warning(f'Exposure files already ingested for visit {pfsVisit.visit}.')
             return 0
 
-        pathList = [file.filepath for file in pfsVisit.exposureFiles]
+        # only transferring new files, already ingested ones cost nothing.
+        pathList = [file.filepath for file in toIngest]
         totalBytes = sum(os.path.getsize(path) for path in pathList)
         totalMB = totalBytes / 2 ** 20
 
         self.engine.logger.info(f'Ingesting exposure files for visit {pfsVisit.visit} (total size: {totalMB:.2f} MB).')
-        self.rawTask.run(pathList)
+        refs = self.rawTask.run(pathList)
+        self.engine.ingestIndex.addRawRefs(refs)
 
         for file in toIngest:
-            file.initialize(self.engine.rawButler)
+            file.initialize(self.engine.ingestIndex)
 
         return totalMB
 
+    def ingestRawFiles(self, files):
+        """
+        Ingest raw files in a single call, falling back to one call per file if it fails, so that one bad file does
+        not fail the others.
+
+        Parameters
+        ----------
+        files : list of CCDFile or HxFile
+            Exposure files to ingest, their ingestion state is updated.
+        """
+        try:
+            refs = self.rawTask.run([file.filepath for file in files])
+        except Exception as e:
+            self.engine.logger.warning(f'raw ingest of {len(files)} file(s) failed: {e}')
+            refs = []
+            # some files might have been registered before the failure, re-synchronizing with the registry.
+            self.engine.ingestIndex.refresh(set([file.visit for file in files]), doPfsConfig=False)
+
+            for file in files:
+                file.initialize(self.engine.ingestIndex)
+
+                # a single file has just failed on its own, no need to retry it.
+                if file.ingested or len(files) == 1:
+                    continue
+
+                try:
+                    refs.extend(self.rawTask.run([file.filepath]))
+                except Exception as e:
+                    self.engine.logger.exception(f'raw ingest of {file.filepath} failed: {e}')
+
+        self.engine.ingestIndex.addRawRefs(refs)
+
+        for file in files:
+            file.initialize(self.engine.ingestIndex)
+
     def doIngest(self, pfsVisit, cmd=None):
         """Ingest both exposure files and the pfsConfig file for a visit."""
         if not pfsVisit.exposureFiles:
             self.engine.logger.warning(f'No exposure files found for visit {pfsVisit.visit}.')
             return
 
-        cmd = self.engine.actor.bcast if cmd is None else cmd
+        cmd = self.engine.bcast if cmd is None else cmd
         startTime = time.time()
 
         totalMB = self.ingestExposureFiles(pfsVisit)
@@ -90,9 +161,97 @@ class IngestHandler(object):
 
         returnCode = 0
         timing = time.time() - startTime
-        speed = totalMB / timing
+        speed = totalMB / max(timing, 1e-6)
 
         if not pfsVisit.isIngested:
             cmd.warn(f'ingestStatus={pfsVisit.visit},{returnCode},FAILED,{timing:.1f},{speed:.1f}')
         else:
             cmd.inform(f'ingestStatus={pfsVisit.visit},{returnCode},OK,{timing:.1f},{speed:.1f}')
+
+    def doIngestBatch(self, pfsVisits, chunkSize=None, cmd=None):
+        """
+        Ingest the exposure files and pfsConfig files of several visits, in chunks of files.
+
+        Each chunk is a single raw ingest (or pfsConfig ingest) call, so the transaction, dimension records and
+        logger setup are paid once per chunk instead of once per visit.
+
+        Parameters
+        ----------
+        pfsVisits : list of PfsVisit
+            Visits to ingest.
+        chunkSize : int, optional
+            Maximum number of files per ingest call, defaults to the engine `ingestChunkSize`.
+        cmd : Command, optional
+            Command to reply to, defaults to the actor bcast.
+        """
+        cmd = self.engine.bcast if cmd is None else cmd
+        chunkSize = self.engine.ingestChunkSize if chunkSize is None else chunkSize
+        startTime = time.time()
+
+        if chunkSize <= 0:
+            raise ValueError(f'chunkSize must be a positive number, got {chunkSize}')
+
+        for pfsVisit in pfsVisits:
+            if not pfsVisit.exposureFiles:
+                self.engine.logger.warning(f'No exposure files found for visit {pfsVisit.visit}.')
+
+        pfsVisits = [pfsVisit for pfsVisit in pfsVisits if pfsVisit.exposureFiles]
+
+        # time and size attributed to each visit, chunk timing being shared evenly between its files.
+        visitTime = dict([(pfsVisit.visit, 0) for pfsVisit in pfsVisits])
+        visitMB = dict([(pfsVisit.visit, 0) for pfsVisit in pfsVisits])
+
+        toIngest = [(pfsVisit, file) for pfsVisit in pfsVisits for file in pfsVisit.exposureFiles if not file.ingested]
+        rawChunks = [toIngest[i:i + chunkSize] for i in range(0, len(toIngest), chunkSize)]
+
+        for iChunk, chunk in enumerate(rawChunks):
+            chunkStart = time.time()
+            sizes = [os.path.getsize(file.filepath) / 2 ** 20 for pfsVisit, file in chunk]
+
+            self.ingestRawFiles([file for pfsVisit, file in chunk])
+            timing = time.time() - chunkStart
+
+            for (pfsVisit, file), size in zip(chunk, sizes):
+                visitTime[pfsVisit.visit] += timing / len(chunk)
+                visitMB[pfsVisit.visit] += size
+
+            speed = sum(sizes) / max(timing, 1e-6)
+            cmd.inform(f'ingestChunk=raw,{iChunk + 1},{len(rawChunks)},{len(chunk)},{timing:.1f},{speed:.1f}')
+
+        for pfsVisit in pfsVisits:
+            if pfsVisit.pfsConfigFile.filepath is None:
+                self.engine.logger.warning(f'no filepath for pfsConfig with visit={pfsVisit.visit}')
+
+        toIngest = [pfsVisit for pfsVisit in pfsVisits
+                    if not pfsVisit.pfsConfigFile.ingested and pfsVisit.pfsConfigFile.filepath is not None]
+        pfsConfigChunks = [toIngest[i:i + chunkSize] for i in range(0, len(toIngest), chunkSize)]
+
+        for iChunk, chunk in enumerate(pfsConfigChunks):
+            chunkStart = time.time()
+            self.ingestPfsConfigFiles(chunk)
+            timing = time.time() - chunkStart
+
+            for pfsVisit in chunk:
+                visitTime[pfsVisit.visit] += timing / len(chunk)
+
+            cmd.inform(f'ingestChunk=pfsConfig,{iChunk + 1},{len(pfsConfigChunks)},{len(chunk)},{timing:.1f},0.0')
+
+        returnCode = 0
+
+        for pfsVisit in pfsVisits:
+            timing = visitTime[pfsVisit.visit]
+            speed = visitMB[pfsVisit.visit] / timing if timing else 0
+
+            if not pfsVisit.isIngested:
+                cmd.warn(f'ingestStatus={pfsVisit.visit},{returnCode},FAILED,{timing:.1f},{speed:.1f}')
+            else:
+                cmd.inform(f'ingestStatus={pfsVisit.visit},{returnCode},OK,{timing:.1f},{speed:.1f}')
+
+        nFiles = sum([len(chunk) for chunk in rawChunks + pfsConfigChunks])
+        totalMB = sum(visitMB.values())
+        timing = time.time() - startTime
+        speed = totalMB / max(timing, 1e-6)
+
+        self.engine.logger.info(f'Ingested {nFiles} files ({totalMB:.2f} MB) for {len(pfsVisits)} visits '
+                                f'in {timing:.1f}s ({speed:.1f} MB/s).')
+        cmd.inform(f'ingestThroughput={len(pfsVisits)},{nFiles},{totalMB:.1f},{timing:.1f},{speed:.1f}')
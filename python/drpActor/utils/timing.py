@@ -0,0 +1,165 @@
+import datetime
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timezone
+
+
+class StageTimer:
+    """
+    Record the time spent in successive named stages, e.g. the phases of the actor startup.
+
+    Parameters
+    ----------
+    name : str
+        Name of what is being timed, used as a prefix in the generated keywords and logs.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = []  # (stage, duration) in completion order.
+        self.lock = threading.Lock()
+
+    @property
+    def total(self):
+        """Total time spent in the recorded stages."""
+        with self.lock:
+            return sum([duration for stage, duration in self.stages])
+
+    @contextmanager
+    def stage(self, stage):
+        """Time the enclosed block as a stage, the duration is recorded even if the block raises."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(stage, time.time() - start)
+
+    def add(self, stage, duration):
+        """Record a stage timed elsewhere."""
+        with self.lock:
+            self.stages.append((stage, duration))
+
+    def totals(self):
+        """Total time per stage name, a stage recorded several times being summed, in first recorded order."""
+        totals = dict()
+
+        with self.lock:
+            for stage, duration in self.stages:
+                totals[stage] = totals.get(stage, 0) + duration
+
+        return totals
+
+    def summary(self):
+        """One line summary, suitable for logs."""
+        with self.lock:
+            stages = ', '.join([f'{stage}={duration:.2f}s' for stage, duration in self.stages])
+
+        return f'{self.name}: {stages}'
+
+    def genKeys(self, cmd):
+        """Generate one keyword per recorded stage."""
+        with self.lock:
+            stages = list(self.stages)
+
+        for stage, duration in stages:
+            cmd.inform(f'{self.name}Time={stage},{duration:.3f}')
+
+
+class VisitMetrics:
+    """
+    Per-visit stage timings, published once the visit is done.
+
+    Stages are recorded from the engine threads as the visit goes through the event queue, ingestion, quantum graph
+    generation and execution. Each stage is published as a `visitStageTime` keyword and, if a path is configured,
+    the whole record is appended to a JSON lines file.
+
+    Parameters
+    ----------
+    engine : DrpEngine
+        The engine instance, providing the actor and the logger.
+    path : str, optional
+        JSON lines file the metrics of each visit are appended to.
+    """
+
+    def __init__(self, engine, path=None):
+        self.engine = engine
+        self.path = path
+
+        self.timers = dict()  # visit -> StageTimer
+        self.lastQuantumDone = dict()  # visit -> time.time() of the last completed quantum.
+        self.lock = threading.Lock()
+
+    @property
+    def logger(self):
+        """Retrieve the logger instance from the engine."""
+        return self.engine.logger
+
+    def get(self, visit):
+        """Return the timer of that visit, created if needed."""
+        with self.lock:
+            if visit not in self.timers:
+                self.timers[visit] = StageTimer(f'visit{visit}')
+
+            return self.timers[visit]
+
+    def stage(self, visit, stage):
+        """Time the enclosed block as a stage of that visit."""
+        return self.get(visit).stage(stage)
+
+    def add(self, visits, stage, duration):
+        """Record a stage for each visit, stages shared by several visits (eg group reduction) count for each."""
+        for visit in visits:
+            self.get(visit).add(stage, duration)
+
+    def quantumDone(self, visits, label, duration):
+        """Record a completed quantum for each visit it belongs to."""
+        self.add(visits, f'quantum.{label}', duration)
+        now = time.time()
+
+        with self.lock:
+            for visit in visits:
+                self.lastQuantumDone[visit] = now
+
+    def reduceTime(self, visit, start, end):
+        """Reduction time of a visit, from `start` to its last completed quantum, or to `end` if none completed."""
+        with self.lock:
+            return self.lastQuantumDone.get(visit, end) - start
+
+    def publish(self, visit, cmd=None):
+        """
+        Generate the stage keywords of a visit, append them to the metrics file and forget about that visit.
+
+        Parameters
+        ----------
+        visit : int
+            Visit identifier.
+        cmd : Command, optional
+            Command to reply to, defaults to the actor bcast.
+        """
+        with self.lock:
+            timer = self.timers.pop(visit, None)
+            self.lastQuantumDone.pop(visit, None)
+
+        if timer is None:
+            return
+
+        cmd = self.engine.bcast if cmd is None else cmd
+        totals = timer.totals()
+
+        for stage, duration in totals.items():
+            cmd.inform(f'visitStageTime={visit},{stage},{duration:.3f}')
+
+        if self.path:
+            record = dict(visit=visit, time=datetime.datetime.now(timezone.utc).isoformat(), stages=totals)
+            self.write(record)
+
+    def write(self, record):
+        """Append a record to the metrics file."""
+        try:
+            with self.lock:
+                with open(self.path, 'a') as metricsFile:
+                    metricsFile.write(json.dumps(record) + '\n')
+        except OSError as e:
+            self.logger.warning(f'could not write metrics to {self.path}: {e}')
@@ -0,0 +1,86 @@
+import json
+import threading
+
+
+class VisitRetention:
+    """
+    Bounded retention of the engine `PfsVisit` objects.
+
+    The last `maxVisits` visits are kept, along with all the visits of the current night (the night of the most
+    recent visit with exposures) if `keepCurrentNight` is set. Older visits are evicted once processed, or once stale,
+    i.e. from a night before the current one, and a compact record of each is appended to a JSON lines journal, if
+    configured. Visits merely ingested during the current night might still be reduced, hence are kept.
+
+    Parameters
+    ----------
+    engine : DrpEngine
+        The engine instance, providing the `pfsVisits` dictionary and the logger.
+    maxVisits : int, optional
+        Number of most recent visits always kept.
+    keepCurrentNight : bool, optional
+        Also keep all the visits of the current night.
+    journal : str, optional
+        JSON lines file the evicted visits are appended to.
+    """
+
+    def __init__(self, engine, maxVisits=500, keepCurrentNight=True, journal=None):
+        self.engine = engine
+        self.maxVisits = maxVisits
+        self.keepCurrentNight = keepCurrentNight
+        self.journal = journal
+
+        self.lock = threading.Lock()
+
+    @property
+    def logger(self):
+        """Retrieve the logger instance from the engine."""
+        return self.engine.logger
+
+    def apply(self):
+        """Evict the visits outside the retention window from the engine, journaling them."""
+        pfsVisits = self.engine.pfsVisits
+
+        if len(pfsVisits) <= self.maxVisits:
+            return
+
+        with self.lock:
+            # snapshot, the dictionary is updated from the event threads.
+            visits = sorted(list(pfsVisits.items()))
+            keep = set([visit for visit, pfsVisit in visits[-self.maxVisits:]])
+            # the most recent visits might not have any exposure yet, hence no night.
+            nights = [pfsVisit.night for visit, pfsVisit in reversed(visits) if pfsVisit.night is not None]
+            lastNight = nights[0] if nights else None
+            currentNight = lastNight if self.keepCurrentNight else None
+
+            evicted = []
+
+            for visit, pfsVisit in visits:
+                if visit in keep or (currentNight is not None and pfsVisit.night == currentNight):
+                    continue
+
+                isStale = pfsVisit.night is not None and lastNight is not None and pfsVisit.night < lastNight
+
+                if not (pfsVisit.wasProcessed or isStale):
+                    continue
+
+                pfsVisits.pop(visit, None)
+                evicted.append(pfsVisit)
+
+            if not evicted:
+                return
+
+            # the ingestion state of evicted visits would be queried again if ever needed.
+            self.engine.ingestIndex.forget([pfsVisit.visit for pfsVisit in evicted])
+            self.logger.info(f'evicted {len(evicted)} visit(s), {len(pfsVisits)} left in memory')
+            self.write([pfsVisit.toRecord() for pfsVisit in evicted])
+
+    def write(self, records):
+        """Append records to the journal."""
+        if not self.journal:
+            return
+
+        try:
+            with open(self.journal, 'a') as journalFile:
+                journalFile.write(''.join([json.dumps(record) + '\n' for record in records]))
+        except OSError as e:
+            self.logger.warning(f'could not write visit journal {self.journal}: {e}')
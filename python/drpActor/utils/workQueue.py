@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import deque
+from functools import partial
+
+
+class Job:
+    """
+    A unit of work submitted to a `WorkQueue`.
+
+    Parameters
+    ----------
+    func : callable
+        The function to execute, with its arguments already bound.
+    key : hashable, optional
+        Jobs sharing the same key are executed one at a time, in submission order (eg the visit).
+    barrier : bool, optional
+        If True, the job only starts once all previously submitted jobs are done, and no later job starts until it
+        is done.
+    """
+
+    def __init__(self, func, key=None, barrier=False):
+        self.func = func
+        self.key = key
+        self.barrier = barrier
+        self.submitted = time.time()
+        self.started = None
+
+    @property
+    def waitTime(self):
+        """Time spent in the queue before being started, None if not started yet."""
+        return None if self.started is None else self.started - self.submitted
+
+    @property
+    def name(self):
+        """Name of the wrapped function, for logging."""
+        func = self.func.func if isinstance(self.func, partial) else self.func
+        return getattr(func, '__name__', str(func))
+
+
+class WorkQueue:
+    """
+    Job queue served by a fixed number of worker threads.
+
+    Keyvar callbacks only enqueue jobs, so the twisted reactor is never blocked by ingestion or reduction. If bounded,
+    the queue applies backpressure by refusing new jobs once `maxQueueSize` pending jobs are waiting.
+
+    Parameters
+    ----------
+    engine : DrpEngine
+        The engine instance, providing the actor and the logger.
+    name : str
+        Name of the queue, used in keywords and thread names.
+    nWorkers : int, optional
+        Number of worker threads.
+    maxQueueSize : int, optional
+        Maximum number of pending jobs, None for an unbounded queue.
+    statusPeriod : float, optional
+        Minimum time in seconds between two queue status keywords, except when the queue becomes idle.
+    """
+
+    def __init__(self, engine, name, nWorkers=1, maxQueueSize=200, statusPeriod=1.0):
+        self.engine = engine
+        self.name = name
+        self.nWorkers = nWorkers
+        self.maxQueueSize = maxQueueSize
+        self.statusPeriod = statusPeriod
+
+        self.jobs = deque()
+        self.busyKeys = set()
+        self.nBusy = 0
+        self.barrierRunning = False
+        self.exitASAP = False
+
+        self.cond = threading.Condition()
+        self.threads = []
+        self.local = threading.local()  # job being executed by the current worker thread.
+        self.lastStatus = None  # (depth, nBusy) last generated.
+        self.lastStatusTime = 0
+
+    @property
+    def logger(self):
+        """Retrieve the logger instance from the engine."""
+        return self.engine.logger
+
+    @property
+    def currentJob(self):
+        """Job being executed by the calling worker thread, None if called from another thread."""
+        return getattr(self.local, 'job', None)
+
+    @property
+    def depth(self):
+        """Number of pending jobs."""
+        return len(self.jobs)
+
+    def start(self):
+        """Start worker threads, done lazily on first submission."""
+        for i in range(self.nWorkers):
+            thread = threading.Thread(target=self._work, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Ask worker threads to exit once they are done with their current job, pending jobs are dropped."""
+        with self.cond:
+            self.exitASAP = True
+            self.jobs.clear()
+            self.cond.notify_all()
+
+    def submit(self, func, *args, key=None, barrier=False, **kwargs):
+        """
+        Enqueue a job.
+
+        Parameters
+        ----------
+        func : callable
+            Function to execute in a worker thread.
+        *args, **kwargs :
+            Arguments to pass to the function.
+        key : hashable, optional
+            Serialization key, jobs with the same key never run concurrently.
+        barrier : bool, optional
+            Run the job alone, after all previously submitted jobs.
+
+        Returns
+        -------
+        bool
+            True if the job was accepted, False if the queue is full.
+        """
+        job = Job(partial(func, *args, **kwargs), key=key, barrier=barrier)
+
+        with self.cond:
+            if self.exitASAP:
+                return False
+
+            if self.maxQueueSize is not None and len(self.jobs) >= self.maxQueueSize:
+                self.logger.warning(f'{self.name} queue full ({self.maxQueueSize} jobs), rejecting {job.name}')
+                self.engine.bcast.warn(f'text="{self.name} queue full, rejecting {job.name} {args}"')
+                return False
+
+            if not self.threads:
+                self.start()
+
+            self.jobs.append(job)
+            self.cond.notify()
+
+        self.statusChanged()
+        return True
+
+    def genStatus(self, cmd=None):
+        """Generate queue depth keyword."""
+        cmd = self.engine.bcast if cmd is None else cmd
+        cmd.inform(f'engineQueue={self.name},{self.depth},{self.nBusy},{self.nWorkers}')
+
+    def statusChanged(self):
+        """Generate queue depth keyword if the queue state changed, at most every `statusPeriod` unless idle."""
+        with self.cond:
+            status = (self.depth, self.nBusy)
+            now = time.time()
+            isIdle = status == (0, 0)
+
+            if status == self.lastStatus or (not isIdle and now - self.lastStatusTime < self.statusPeriod):
+                return
+
+            self.lastStatus = status
+            self.lastStatusTime = now
+
+        self.genStatus()
+
+    def _nextJob(self):
+        """Pop the next runnable job, must be called with the condition held."""
+        if self.barrierRunning:
+            return None
+
+        for i, job in enumerate(self.jobs):
+            if job.barrier:
+                # barrier can only start once everything submitted before is done.
+                if i == 0 and not self.nBusy:
+                    del self.jobs[i]
+                    return job
+                # nothing submitted after a barrier can overtake it.
+                return None
+
+            if job.key is None or job.key not in self.busyKeys:
+                del self.jobs[i]
+                return job
+
+        return None
+
+    def _work(self):
+        """Worker thread main loop."""
+        while True:
+            with self.cond:
+                job = self._nextJob()
+
+                while job is None and not self.exitASAP:
+                    self.cond.wait()
+                    job = self._nextJob()
+
+                if self.exitASAP:
+                    return
+
+                self.nBusy += 1
+                self.barrierRunning = job.barrier
+                if job.key is not None:
+                    self.busyKeys.add(job.key)
+
+            job.started = time.time()
+            self.local.job = job
+
+            try:
+                job.func()
+            except Exception as e:
+                self.logger.exception(f'{self.name} job {job.name} failed: {e}')
+            finally:
+                self.local.job = None
+
+                with self.cond:
+                    self.nBusy -= 1
+                    self.barrierRunning = False
+                    self.busyKeys.discard(job.key)
+                    # completing a job can unblock others, not only one.
+                    self.cond.notify_all()
+
+                self.statusChanged()